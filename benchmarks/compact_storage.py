@@ -0,0 +1,120 @@
+"""
+Measure how much the compact layout (src.data.compact) saves for the sales and customer tables.
+
+Both layouts are generated from the same seed, so they hold the same rows. For each table the
+pandas memory (deep) and the SQLite file size are reported. The file size is measured on a
+fresh database holding just that table, written by the native loader, before and after the
+configured indexes are built. The compact size includes the table's lookup tables.
+
+Usage (from the repository root):
+    python -m benchmarks.compact_storage --products 200 --customers 5000 --years 1 --output compact.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("RETAIL_CONFIG_PATH", os.path.join(REPO_ROOT, "configs", "data_config.json"))
+
+TABLES = ["sales_sdf", "customer_sdf"]
+
+
+def generate(scale, compact):
+    """Generate the product, customer and sales tables in one layout."""
+    from src.data import data_generation as dg
+    from src.data.compact import compact_frame
+
+    dg.configure(compact=compact, **scale)
+    product_df = dg.generate_product_data()
+    customer_df = dg.generate_customer_data()
+    if compact:
+        product_df = compact_frame(product_df, "product_sdf")
+        customer_df = compact_frame(customer_df, "customer_sdf")
+    customer_column = "Customer_Key" if compact else "Customer_ID"
+    start_time = time.perf_counter()
+    sales_df = dg.generate_sales_data(product_df, customer_df[customer_column].to_numpy())
+    return {"sales_sdf": sales_df, "customer_sdf": customer_df}, time.perf_counter() - start_time
+
+
+def sqlite_bytes(tables, work_dir, name):
+    """
+    Write tables to a fresh SQLite file with the native loader, then add the configured indexes.
+
+    :return: Tuple of (file size without indexes, file size with indexes) in bytes.
+    """
+    from src.data.database_operations import bulk_insert_dataframe_to_sqlite, close_all_connections, create_indexes
+    from src.utils.spark_utils import get_config
+
+    db_path = os.path.join(work_dir, f"{name}.db")
+    for table_name, df in tables.items():
+        bulk_insert_dataframe_to_sqlite(df, table_name, db_path)
+    table_bytes = os.path.getsize(db_path)
+    create_indexes(db_path, get_config().get("indexes", {}).get("tables", {}))
+    close_all_connections()
+    return table_bytes, os.path.getsize(db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=200, help="Number of products.")
+    parser.add_argument("--customers", type=int, default=5000, help="Customers per year.")
+    parser.add_argument("--years", type=int, default=1, help="Number of years of sales.")
+    parser.add_argument("--output", help="Where to write the JSON results.")
+    args = parser.parse_args()
+
+    from src.data.compact import lookup_tables, storage_frame
+
+    scale = {"num_products": args.products, "num_customers": args.customers, "num_years": args.years}
+    wide, wide_seconds = generate(scale, compact=False)
+    compact, compact_seconds = generate(scale, compact=True)
+
+    work_dir = tempfile.mkdtemp(prefix="retail_compact_")
+    results = {}
+    try:
+        for table_name in TABLES:
+            wide_df, compact_df = wide[table_name], compact[table_name]
+            stored = {table_name: storage_frame(compact_df), **lookup_tables(compact_df)}
+            wide_bytes = sqlite_bytes({table_name: wide_df}, work_dir, f"wide_{table_name}")
+            compact_bytes = sqlite_bytes(stored, work_dir, f"compact_{table_name}")
+            entry = {
+                "rows": len(wide_df),
+                "wide_memory_mb": wide_df.memory_usage(deep=True).sum() / 2 ** 20,
+                "compact_memory_mb": compact_df.memory_usage(deep=True).sum() / 2 ** 20,
+                "wide_sqlite_mb": wide_bytes[0] / 2 ** 20,
+                "compact_sqlite_mb": compact_bytes[0] / 2 ** 20,
+                "wide_indexed_mb": wide_bytes[1] / 2 ** 20,
+                "compact_indexed_mb": compact_bytes[1] / 2 ** 20
+            }
+            for measure in ("memory", "sqlite", "indexed"):
+                entry[f"{measure}_reduction"] = 1 - entry[f"compact_{measure}_mb"] / entry[f"wide_{measure}_mb"]
+            results[table_name] = {key: round(value, 3) if isinstance(value, float) else value
+                                   for key, value in entry.items()}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    results["sales_generation_seconds"] = {"wide": round(wide_seconds, 3), "compact": round(compact_seconds, 3)}
+
+    print()
+    for table_name in TABLES:
+        entry = results[table_name]
+        print(f"{table_name} ({entry['rows']} rows): pandas {entry['wide_memory_mb']} -> "
+              f"{entry['compact_memory_mb']} MB (-{entry['memory_reduction']:.0%}), SQLite "
+              f"{entry['wide_sqlite_mb']} -> {entry['compact_sqlite_mb']} MB (-{entry['sqlite_reduction']:.0%}), "
+              f"with indexes {entry['wide_indexed_mb']} -> {entry['compact_indexed_mb']} MB "
+              f"(-{entry['indexed_reduction']:.0%})")
+    print(f"Sales generation: {wide_seconds:.2f}s wide, {compact_seconds:.2f}s compact")
+
+    if args.output:
+        report = {"created_at": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                  "platform": platform.platform(), "scale": scale, "results": results}
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measure how long it takes to import the pipeline modules, optionally against an older revision.
+
+Each import runs in a fresh interpreter from src/data (where the default config path resolves), so
+the numbers include everything a module does at import time, such as loading the config or
+starting a SparkSession.
+
+Usage (from the repository root):
+    python -m benchmarks.import_time --repeat 5 --compare-ref <git-ref>
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from io import BytesIO
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MODULES = [
+    "src.data.database_operations",
+    "src.utils.spark_utils",
+    "src.utils.logging_utils",
+    "src.data.data_generation",
+]
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+
+def time_import(module, root, repeat):
+    """
+    Import a module in a fresh interpreter `repeat` times.
+
+    :param module: Dotted module name.
+    :param root: Repository root to import from.
+    :param repeat: Number of runs.
+    :return: Dictionary with the median and min seconds, or the error of the first failing run.
+    """
+    env = dict(os.environ, PYTHONPATH=root)
+    timings = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+                                cwd=os.path.join(root, "src", "data"), env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return {"median_seconds": round(statistics.median(timings), 4), "min_seconds": round(min(timings), 4)}
+
+
+def export_ref(ref, target_dir):
+    """Extract the tree of a git revision into target_dir."""
+    archive = subprocess.run(["git", "archive", ref], cwd=REPO_ROOT, capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=BytesIO(archive)) as tar:
+        tar.extractall(target_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh-interpreter runs per module.")
+    parser.add_argument("--compare-ref", help="Git revision to benchmark alongside the working tree.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    results = {"current": {module: time_import(module, REPO_ROOT, args.repeat) for module in MODULES}}
+    if args.compare_ref:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            export_ref(args.compare_ref, tmp_dir)
+            results[args.compare_ref] = {module: time_import(module, tmp_dir, args.repeat) for module in MODULES}
+
+    for label, timings in results.items():
+        print(f"== {label}")
+        for module, timing in timings.items():
+            summary = timing.get("error") or f"{timing['median_seconds']:.3f}s median, {timing['min_seconds']:.3f}s min"
+            print(f"  {module:<32} {summary}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
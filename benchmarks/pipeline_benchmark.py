@@ -0,0 +1,255 @@
+"""
+Benchmark the generation, load and read stages of the pipeline at configurable scales.
+
+Every stage runs in a fresh process against a temporary SQLite file and records wall time,
+rows/sec and peak RSS. Results are written as JSON; with --baseline the run is compared against
+an earlier results file and regressions beyond --threshold are reported (exit code 1).
+
+Usage (from the repository root):
+    python -m benchmarks.pipeline_benchmark --scale small --scale medium --output bench.json
+    python -m benchmarks.pipeline_benchmark --scale small --baseline bench.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from queue import Empty
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("RETAIL_CONFIG_PATH", os.path.join(REPO_ROOT, "configs", "data_config.json"))
+
+SCALES = {
+    "small": {"num_products": 50, "num_customers": 500, "num_years": 1},
+    "medium": {"num_products": 200, "num_customers": 5000, "num_years": 2},
+    "large": {"num_products": 200, "num_customers": 5000, "num_years": 5},
+}
+SPARK_STAGES = ["spark_insert_sales", "spark_read_sales"]
+STAGE_TIMEOUT = 3600
+
+
+def _peak_rss_mb():
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _prepare(stage, scale, db_path):
+    """Build the inputs a stage needs; not part of the timed section."""
+    from src.data import data_generation as dg
+    from src.data.database_operations import bulk_insert_dataframe_to_sqlite
+
+    dg.configure(**scale)
+    inputs = {"db_path": db_path}
+    if stage in ("generate_products", "generate_customers"):
+        return inputs
+    inputs["product_df"] = dg.generate_product_data()
+    inputs["customer_ids"] = dg.generate_customer_data()["Customer_ID"].tolist()
+    if stage == "generate_sales":
+        return inputs
+    inputs["sales_df"] = dg.generate_sales_data(inputs["product_df"], inputs["customer_ids"])
+    if stage in ("sqlite_admin_query", "spark_read_sales"):
+        bulk_insert_dataframe_to_sqlite(inputs["sales_df"], "sales_sdf", db_path)
+    return inputs
+
+
+def _run(stage, inputs):
+    """Run the timed part of a stage and return the number of rows it processed."""
+    from src.data import data_generation as dg
+    from src.data.database_operations import SQLiteDBAdmin, bulk_insert_dataframe_to_sqlite
+
+    db_path = inputs["db_path"]
+    if stage == "generate_products":
+        return len(dg.generate_product_data())
+    if stage == "generate_customers":
+        return len(dg.generate_customer_data())
+    if stage == "generate_sales":
+        return len(dg.generate_sales_data(inputs["product_df"], inputs["customer_ids"]))
+    if stage == "generate_feedback":
+        dg.generate_feedback_data(inputs["sales_df"])
+        return len(inputs["sales_df"])
+    if stage == "generate_loyalty":
+        dg.calculate_loyalty_points(inputs["sales_df"])
+        return len(inputs["sales_df"])
+    if stage == "bulk_insert_sales":
+        return bulk_insert_dataframe_to_sqlite(inputs["sales_df"], "sales_sdf", db_path)["rows"]
+    if stage == "sqlite_admin_query":
+        db_admin = SQLiteDBAdmin(db_path)
+        db_admin.connect()
+        rows = sum(len(batch) for batch in db_admin.iter_query_batches("SELECT * FROM sales_sdf"))
+        db_admin.execute_query("SELECT Customer_ID, SUM(Sales_Amount) FROM sales_sdf GROUP BY Customer_ID")
+        db_admin.close()
+        return rows
+    if stage == "sqlite_admin_execute_many":
+        db_admin = SQLiteDBAdmin(db_path)
+        db_admin.connect()
+        db_admin.execute_non_query("CREATE TABLE IF NOT EXISTS bench_rows (Transaction_ID TEXT, Sales_Amount REAL)")
+        rows = db_admin.execute_many("INSERT INTO bench_rows VALUES (?, ?)",
+                                     zip(inputs["sales_df"]["Transaction_ID"].tolist(),
+                                         inputs["sales_df"]["Sales_Amount"].tolist()))
+        db_admin.close()
+        return rows
+    if stage == "spark_insert_sales":
+        from src.utils.spark_utils import get_config, get_spark, insert_dataframe_to_sqlite, pandas_to_spark
+        sdf, _ = pandas_to_spark(get_spark(), inputs["sales_df"], "sales_sdf", get_config()["data_table_schemas"])
+        insert_dataframe_to_sqlite(sdf, "sales_sdf", db_path, "org.sqlite.JDBC")
+        return len(inputs["sales_df"])
+    if stage == "spark_read_sales":
+        from src.utils.spark_utils import get_spark, read_dataframe_from_sqlite
+        return read_dataframe_from_sqlite(get_spark(), "sales_sdf", db_path, "org.sqlite.JDBC").count()
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+def _stage_worker(stage, scale, db_path, queue):
+    """Child-process entry point: prepare, time the stage and report the measurements."""
+    try:
+        inputs = _prepare(stage, scale, db_path)
+        rss_before = _peak_rss_mb()
+        start_time = time.perf_counter()
+        rows = _run(stage, inputs)
+        elapsed = time.perf_counter() - start_time
+        peak_rss = _peak_rss_mb()
+        queue.put({"rows": rows, "seconds": round(elapsed, 4),
+                   "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else None,
+                   "peak_rss_mb": round(peak_rss, 1), "peak_rss_increase_mb": round(peak_rss - rss_before, 1)})
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def run_stage(stage, scale, timeout=STAGE_TIMEOUT):
+    """
+    Run one stage in a fresh process against its own temporary SQLite file.
+
+    A worker that dies without reporting (killed for memory, crashed in native code) or that runs
+    past the timeout yields an "error" entry instead of blocking the whole benchmark.
+
+    :param stage: Stage name.
+    :param scale: Generation settings for data_generation.configure.
+    :param timeout: Seconds the stage may run before it is terminated.
+    :return: Dictionary of measurements (or an "error" entry).
+    """
+    tmp_dir = tempfile.mkdtemp(prefix="retail_bench_")
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_stage_worker, args=(stage, scale, os.path.join(tmp_dir, "bench.db"), queue))
+    deadline = time.monotonic() + timeout
+    result = None
+    try:
+        process.start()
+        while result is None:
+            try:
+                result = queue.get(timeout=1)
+            except Empty:
+                if not process.is_alive():
+                    # A result put just before exiting may still be on its way through the pipe
+                    try:
+                        result = queue.get(timeout=1)
+                    except Empty:
+                        result = {"error": f"stage {stage} exited with code {process.exitcode} without a result"}
+                elif time.monotonic() > deadline:
+                    process.terminate()
+                    result = {"error": f"stage {stage} timed out after {timeout}s"}
+        process.join()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return result
+
+
+def compare(results, baseline, threshold):
+    """
+    Flag stages that got slower or bigger than the baseline by more than threshold (e.g. 0.2 = 20%).
+
+    :param results: Results list from this run.
+    :param baseline: Results list from the baseline file.
+    :param threshold: Allowed relative increase in seconds and peak RSS.
+    :return: List of human-readable regression descriptions.
+    """
+    baseline_by_key = {(entry["scale"], entry["stage"]): entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        previous = baseline_by_key.get((entry["scale"], entry["stage"]))
+        if previous is None or "error" in entry or "error" in previous:
+            continue
+        for metric in ("seconds", "peak_rss_mb"):
+            if previous[metric] and entry[metric] > previous[metric] * (1 + threshold):
+                regressions.append(f"{entry['scale']}/{entry['stage']}: {metric} {previous[metric]} -> "
+                                   f"{entry[metric]} (+{entry[metric] / previous[metric] - 1:.0%})")
+    return regressions
+
+
+def _git_revision():
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", action="append", choices=sorted(SCALES),
+                        help="Preset scale to run (repeatable); defaults to small.")
+    parser.add_argument("--products", type=int, help="Custom scale: number of products.")
+    parser.add_argument("--customers", type=int, help="Custom scale: customers per year.")
+    parser.add_argument("--years", type=int, help="Custom scale: number of years.")
+    parser.add_argument("--stage", action="append", help="Only run these stages (repeatable).")
+    parser.add_argument("--with-spark", action="store_true", help="Also run the Spark JDBC insert/read stages.")
+    parser.add_argument("--output", default="bench_output.json", help="Where to write the JSON results.")
+    parser.add_argument("--baseline", help="Results file to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%).")
+    parser.add_argument("--timeout", type=float, default=STAGE_TIMEOUT, help="Seconds each stage may run.")
+    args = parser.parse_args()
+
+    scales = {name: SCALES[name] for name in (args.scale or [])}
+    if args.products or args.customers or args.years:
+        custom = dict(SCALES["small"])
+        custom.update({key: value for key, value in (("num_products", args.products),
+                                                     ("num_customers", args.customers),
+                                                     ("num_years", args.years)) if value})
+        scales[f"custom_{custom['num_products']}p_{custom['num_customers']}c_{custom['num_years']}y"] = custom
+    scales = scales or {"small": SCALES["small"]}
+
+    stages = ["generate_products", "generate_customers", "generate_sales", "generate_feedback", "generate_loyalty",
+              "bulk_insert_sales", "sqlite_admin_query", "sqlite_admin_execute_many"]
+    if args.with_spark:
+        stages += SPARK_STAGES
+    if args.stage:
+        stages = [stage for stage in stages if stage in args.stage]
+
+    results = []
+    for scale_name, scale in scales.items():
+        for stage in stages:
+            entry = {"scale": scale_name, "stage": stage, **run_stage(stage, scale, args.timeout)}
+            results.append(entry)
+            summary = entry.get("error") or (f"{entry['rows']} rows in {entry['seconds']}s "
+                                             f"({entry['rows_per_sec']} rows/sec, peak RSS {entry['peak_rss_mb']} MB)")
+            print(f"[{scale_name}] {stage}: {summary}")
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scales": scales,
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Measure the latency of the in-process price scorer (src.models.dynamic_pricing.scorer).
+
+Sales are generated in memory at the chosen scale, the elasticity index is built from them and
+the scorer is timed for cold single lookups (cache misses), warm single lookups (cache hits) and
+vectorized batches. Percentiles are reported in milliseconds and optionally written as JSON.
+
+Usage (from the repository root):
+    python -m benchmarks.pricing_latency --products 200 --customers 1000 --batch-size 1000 --output pricing.json
+"""
+import argparse
+import json
+import os
+import platform
+import time
+from datetime import datetime
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("RETAIL_CONFIG_PATH", os.path.join(REPO_ROOT, "configs", "data_config.json"))
+
+
+def _percentiles(seconds):
+    milliseconds = np.asarray(seconds) * 1000
+    return {"calls": len(milliseconds),
+            "p50_ms": round(float(np.percentile(milliseconds, 50)), 4),
+            "p95_ms": round(float(np.percentile(milliseconds, 95)), 4),
+            "p99_ms": round(float(np.percentile(milliseconds, 99)), 4),
+            "max_ms": round(float(milliseconds.max()), 4)}
+
+
+def _time_calls(function, arguments):
+    timings = []
+    for args in arguments:
+        start_time = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start_time)
+    return timings
+
+
+def build_index(num_products, num_customers, num_years):
+    """Generate sales in memory and build the elasticity index from them."""
+    from src.data import data_generation as dg
+    from src.models.dynamic_pricing.elasticity import build_elasticity_index
+
+    dg.configure(num_products=num_products, num_customers=num_customers, num_years=num_years)
+    product_df = dg.generate_product_data()
+    sales_df = dg.generate_sales_data(product_df, dg.generate_customer_data()["Customer_ID"].tolist())
+    daily_df = (sales_df.groupby(["Product_ID", "Store_ID", "Date"], as_index=False)
+                .agg(Quantity=("Quantity_Sold", "sum"), Revenue=("Sales_Amount", "sum")))
+    start_time = time.perf_counter()
+    index = build_elasticity_index(daily_df, product_df)
+    return index, {"sales_rows": len(sales_df), "daily_rows": len(daily_df),
+                   "build_seconds": round(time.perf_counter() - start_time, 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=200, help="Number of products.")
+    parser.add_argument("--customers", type=int, default=1000, help="Customers per year.")
+    parser.add_argument("--years", type=int, default=1, help="Number of years of sales.")
+    parser.add_argument("--calls", type=int, default=2000, help="Single lookups timed per mode.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Pairs per batch call.")
+    parser.add_argument("--batches", type=int, default=200, help="Batch calls timed.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for choosing the pairs.")
+    parser.add_argument("--output", help="Where to write the JSON results.")
+    args = parser.parse_args()
+
+    from src.models.dynamic_pricing.scorer import PriceScorer
+
+    index, build = build_index(args.products, args.customers, args.years)
+    print(f"Index: {len(index.product_ids)} products x {len(index.store_ids)} stores, "
+          f"{index.nbytes() / 1024:.1f} KB, built in {build['build_seconds']}s from {build['daily_rows']} daily rows")
+
+    rng = np.random.default_rng(args.seed)
+    num_pairs = len(index.product_ids) * len(index.store_ids)
+    pairs = rng.choice(num_pairs, size=min(args.calls, num_pairs), replace=False)
+    single_args = [(index.product_ids[pair // len(index.store_ids)], index.store_ids[pair % len(index.store_ids)])
+                   for pair in pairs]
+
+    scorer = PriceScorer(index, cache_size=len(single_args))
+    results = {
+        "cold_single": _percentiles(_time_calls(scorer.score, single_args)),
+        "warm_single": _percentiles(_time_calls(scorer.score, single_args))
+    }
+    batch_args = []
+    for _ in range(args.batches):
+        batch = rng.integers(0, num_pairs, args.batch_size)
+        batch_args.append((index.product_ids[batch // len(index.store_ids)],
+                           index.store_ids[batch % len(index.store_ids)]))
+    results["batch"] = _percentiles(_time_calls(scorer.score_batch, batch_args))
+    results["batch"]["pairs_per_sec"] = round(args.batch_size / (results["batch"]["p50_ms"] / 1000), 1)
+    results["cache"] = scorer.cache_info()._asdict()
+
+    for mode in ("cold_single", "warm_single", "batch"):
+        entry = results[mode]
+        print(f"{mode}: p50 {entry['p50_ms']} ms, p95 {entry['p95_ms']} ms, p99 {entry['p99_ms']} ms "
+              f"over {entry['calls']} calls")
+    print(f"batch of {args.batch_size}: {results['batch']['pairs_per_sec']} pairs/sec at p50")
+
+    if args.output:
+        report = {"created_at": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                  "platform": platform.platform(), "settings": vars(args), "index": build, "results": results}
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Compact table layout: integer surrogate keys and categorical codes with lookup tables.
+
+Every generated ID is a prefix plus a number ("P00042", "C10095000", ...), so its surrogate key
+is that number as an int32 in a "<Name>_Key" column and the ID can always be rebuilt from it.
+Low-cardinality labels (names, categories, weekdays, ...) become pandas categoricals in memory
+and their integer codes in storage, with one dim_<column> lookup table per labelled column.
+The <table>_wide views put the original IDs and labels back for SQL readers.
+"""
+import numpy as np
+import pandas as pd
+
+# ID column -> (prefix, zero padding) of the generated IDs
+ID_FORMATS = {
+    "Transaction_ID": ("T", 7),
+    "Product_ID": ("P", 5),
+    "Store_ID": ("S", 3),
+    "Customer_ID": ("C", 4),
+    "Supplier_ID": ("SUP", 0),
+    "Feedback_ID": ("FB", 7),
+    "Loyalty_ID": ("LOY", 7)
+}
+
+# Columns stored as categorical codes, per table
+CATEGORICAL_COLUMNS = {
+    "product_sdf": ["Product_Name", "Brand_Name", "Category", "Subcategory"],
+    "store_sdf": ["Store_Location", "Store_Type"],
+    "customer_sdf": ["First_Name", "Last_Name", "City", "State", "Gender"],
+    "time_sdf": ["Day_of_Week", "Month", "Quarter"],
+    "feedback_sdf": ["Feedback_Text"],
+    "loyalty_sdf": ["Membership_Tier"]
+}
+
+INT32_MIN, INT32_MAX = np.iinfo(np.int32).min, np.iinfo(np.int32).max
+
+
+def key_column(id_column):
+    """Name of the surrogate key column for an ID column ("Product_ID" -> "Product_Key")."""
+    return id_column[:-3] + "_Key"
+
+
+def lookup_table_name(column):
+    """Name of the lookup table holding the labels of a categorical column."""
+    return f"dim_{column.lower()}"
+
+
+def encode_ids(ids, id_column):
+    """
+    Turn generated IDs into their int32 surrogate keys.
+
+    :param ids: Sequence of IDs such as "P00042".
+    :param id_column: The ID column name, which selects the prefix.
+    :return: int32 array of keys.
+    :raises ValueError: If an ID's number does not fit in an int32 key.
+    """
+    prefix = ID_FORMATS[id_column][0]
+    numbers = np.char.lstrip(np.asarray(ids, dtype=str), prefix).astype(np.int64)
+    out_of_range = (numbers < INT32_MIN) | (numbers > INT32_MAX)
+    if out_of_range.any():
+        raise ValueError(f"{id_column} values do not fit in int32 keys: "
+                         f"{np.asarray(ids, dtype=str)[out_of_range][:5].tolist()}")
+    return numbers.astype(np.int32)
+
+
+def decode_ids(keys, id_column):
+    """Rebuild the generated IDs from their surrogate keys."""
+    prefix, width = ID_FORMATS[id_column]
+    return np.char.add(prefix, np.char.zfill(np.asarray(keys).astype("U"), width)).astype(object)
+
+
+def _downcast_integers(series):
+    if series.dtype.kind in "iu" and series.dtype.itemsize > 4 and (
+            series.empty or (series.min() >= INT32_MIN and series.max() <= INT32_MAX)):
+        return series.astype(np.int32)
+    return series
+
+
+def compact_frame(df, table_name):
+    """
+    Convert a generated table to the compact layout.
+
+    ID columns become int32 "<Name>_Key" columns in the same position, labelled columns become
+    categoricals and other integer columns are narrowed to int32 where their values fit. Columns
+    already in compact form are left as they are.
+
+    :param df: pandas DataFrame in the generated (wide) layout.
+    :param table_name: Table name such as "customer_sdf", which selects the categorical columns.
+    :return: New pandas DataFrame.
+    """
+    columns = {}
+    categorical_columns = CATEGORICAL_COLUMNS.get(table_name, [])
+    for column in df.columns:
+        values = df[column]
+        if column in ID_FORMATS:
+            columns[key_column(column)] = encode_ids(values.to_numpy(), column)
+        elif column in categorical_columns and not isinstance(values.dtype, pd.CategoricalDtype):
+            columns[column] = values.astype("category")
+        else:
+            columns[column] = _downcast_integers(values)
+    return pd.DataFrame(columns)
+
+
+def storage_frame(df):
+    """
+    Replace categorical columns by their integer codes for writing to SQLite or CSV.
+
+    :param df: pandas DataFrame in the compact layout.
+    :return: pandas DataFrame with only numeric, datetime and plain text columns.
+    """
+    categorical = [column for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)]
+    if not categorical:
+        return df
+    return df.assign(**{column: df[column].cat.codes for column in categorical})
+
+
+def lookup_tables(df):
+    """
+    Build the lookup table of every categorical column of a compact table.
+
+    :param df: pandas DataFrame in the compact layout.
+    :return: Dictionary of lookup table name to DataFrame with Code and the label column.
+    """
+    return {lookup_table_name(column): pd.DataFrame({
+                "Code": np.arange(len(df[column].cat.categories), dtype=np.int32),
+                column: np.asarray(df[column].cat.categories, dtype=object)})
+            for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)}
+
+
+def storage_tables(dataframes):
+    """
+    Prepare compact tables for a loader: categorical codes in the tables plus their lookup tables.
+
+    :param dataframes: Dictionary of table name to compact pandas DataFrame.
+    :return: Dictionary of table name to DataFrame ready to write, lookup tables included.
+    """
+    tables = {}
+    for table_name, df in dataframes.items():
+        tables[table_name] = storage_frame(df)
+        tables.update(lookup_tables(df))
+    return tables
+
+
+def wide_frame(df):
+    """
+    Inverse of compact_frame: rebuild the IDs and labels of a compact table in pandas.
+
+    :param df: pandas DataFrame in the compact layout (categoricals, not codes).
+    :return: pandas DataFrame with the generated column names and string IDs/labels.
+    """
+    columns = {}
+    for column in df.columns:
+        id_column = column[:-4] + "_ID" if column.endswith("_Key") else None
+        if id_column in ID_FORMATS:
+            columns[id_column] = decode_ids(df[column].to_numpy(), id_column)
+        elif isinstance(df[column].dtype, pd.CategoricalDtype):
+            columns[column] = df[column].astype(object)
+        else:
+            columns[column] = df[column]
+    return pd.DataFrame(columns)
+
+
+class CompactSink:
+    """
+    Sink wrapper that writes compact chunks as codes and each lookup table once.
+
+    Categories of a column must not change between chunks of the same table, which holds for the
+    generators: streamed columns (Feedback_Text, Membership_Tier) use their full fixed vocabulary.
+    """
+
+    def __init__(self, sink):
+        self.sink = sink
+        self._written_lookups = set()
+
+    def write(self, table_name, df):
+        for lookup_name, lookup_df in lookup_tables(df).items():
+            if lookup_name not in self._written_lookups:
+                self.sink.write(lookup_name, lookup_df)
+                self._written_lookups.add(lookup_name)
+        self.sink.write(table_name, storage_frame(df))
+
+    def close(self):
+        self.sink.close()
+
+
+def wide_select(conn, table_name, source=None):
+    """
+    Build the SELECT that reads a compact table in the wide layout.
+
+    The table is aliased as t, so callers can add conditions on the stored table such as
+    "WHERE t.rowid > ?".
+
+    :param conn: sqlite3 connection to the database.
+    :param table_name: The stored table.
+    :param source: Optional SELECT over the stored table that keeps its column names (e.g. an
+                   aggregate by key), read instead of the whole table so only its rows are decoded.
+    :return: SELECT statement, or None when the table has no surrogate keys or coded labels.
+    """
+    lookups = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                              "AND name LIKE 'dim_%'")}
+    selected, joins = [], []
+    from_clause = f'"{table_name}"' if source is None else f"({source})"
+    columns = [column[0] for column in conn.execute(f"SELECT * FROM {from_clause} LIMIT 0").description]
+    for column in columns:
+        id_column = column[:-4] + "_ID" if column.endswith("_Key") else None
+        lookup_name = lookup_table_name(column)
+        if id_column in ID_FORMATS:
+            prefix, width = ID_FORMATS[id_column]
+            number_format = f"%0{width}d" if width else "%d"
+            selected.append(f"printf('{prefix}{number_format}', t.\"{column}\") AS \"{id_column}\"")
+        elif column in CATEGORICAL_COLUMNS.get(table_name, []) and lookup_name in lookups:
+            alias = f"l{len(joins)}"
+            joins.append(f'LEFT JOIN "{lookup_name}" AS {alias} ON {alias}.Code = t."{column}"')
+            selected.append(f'{alias}."{column}" AS "{column}"')
+        else:
+            selected.append(f't."{column}"')
+    if not joins and not any(column.endswith("_Key") for column in columns):
+        return None
+    return f'SELECT {", ".join(selected)} FROM {from_clause} AS t {" ".join(joins)}'.rstrip()
+
+
+def wide_view_statements(conn):
+    """
+    Build CREATE VIEW statements exposing every compact table of a database in the wide layout.
+
+    :param conn: sqlite3 connection to the database.
+    :return: List of CREATE VIEW IF NOT EXISTS statements for <table>_wide views.
+    """
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                             "AND name NOT LIKE 'sqlite_%' AND name NOT LIKE 'dim_%'")]
+    statements = []
+    for table_name in tables:
+        query = wide_select(conn, table_name)
+        if query is not None:
+            statements.append(f'CREATE VIEW IF NOT EXISTS "{table_name}_wide" AS {query}')
+    return statements
+
+
+def readable_table(conn, table_name):
+    """
+    Name to read a table by with the generated (wide) columns: its <table>_wide view when the
+    database holds the table in the compact layout, otherwise the table itself.
+
+    :param conn: sqlite3 connection to the database.
+    :param table_name: The stored table, e.g. "sales_sdf".
+    :return: Table or view name.
+    """
+    view_name = f"{table_name}_wide"
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'view' AND name = ?", (view_name,)).fetchone()
+    return view_name if exists else table_name
+
+
+def create_wide_views(db_path):
+    """
+    Create the <table>_wide views of every compact table in a database.
+
+    :param db_path: Path to the SQLite database.
+    :return: List of the view names.
+    """
+    from src.data.database_operations import get_connection_manager
+
+    with get_connection_manager(db_path).transaction() as conn:
+        statements = wide_view_statements(conn)
+        for statement in statements:
+            conn.execute(statement)
+    views = [statement.split('"')[1] for statement in statements]
+    print(f"Created wide views: {views}")
+    return views
@@ -1,27 +1,73 @@
 import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
 import pandas as pd
 import numpy as np
-from src.utils.spark_utils import load_config, initialize_spark
+from src.data.compact import CompactSink, compact_frame, encode_ids, storage_tables
+from src.utils.instrumentation import configure_instrumentation, span, traced
+from src.utils.spark_utils import get_config, get_spark, pandas_to_spark
+
+# Overrides applied on top of the data_generation config section (see configure)
+_setting_overrides = {}
+
+# Module attributes kept for callers that used the former import-time constants
+_LEGACY_SETTINGS = {
+    "SEED": "seed",
+    "NUM_WORKERS": "workers",
+    "NUM_PRODUCTS": "num_products",
+    "NUM_STORES": "num_stores",
+    "NUM_CUSTOMERS": "num_customers",
+    "NUM_YEARS": "num_years",
+    "START_YEAR": "start_year",
+    "END_YEAR": "end_year",
+    "DATE_RANGE": "date_range"
+}
+
+
+@lru_cache(maxsize=None)
+def get_settings():
+    """
+    Return the generation settings, loading the config and seeding the global RNGs on first use.
+
+    Nothing is read or started at import time, so importing this module for the pandas generators
+    does not need the config file or a SparkSession.
+
+    :return: Dictionary of the data_generation settings plus end_year and date_range.
+    """
+    settings = {"seed": 42, "workers": 1, "compact": False}
+    settings.update(get_config()["data_generation"])
+    settings.update(_setting_overrides)
+    settings["end_year"] = settings["start_year"] + settings["num_years"] - 1
+    settings["date_range"] = pd.date_range(f"{settings['start_year']}-01-01", f"{settings['end_year']}-12-31")
+
+    # Setting random seed for reproducibility
+    np.random.seed(settings["seed"])
+    random.seed(settings["seed"])
+    return settings
 
-# Load configuration
-config = load_config()
 
-# Initialize Spark session
-spark = initialize_spark(config["spark"]["app_name"], config["spark"]["jdbc_driver_path"])
+def configure(**overrides):
+    """
+    Override data_generation settings (e.g. num_customers=1000, num_years=1) for later generation calls.
 
-# Setting random seed for reproducibility
-np.random.seed(42)
-random.seed(42)
+    Calling it again replaces the previous overrides and re-seeds the global RNGs on next use.
+    """
+    _setting_overrides.clear()
+    _setting_overrides.update(overrides)
+    get_settings.cache_clear()
+
+
+def __getattr__(name):
+    if name in _LEGACY_SETTINGS:
+        return get_settings()[_LEGACY_SETTINGS[name]]
+    if name == "config":
+        return get_config()
+    if name == "spark":
+        return get_spark()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Extract configuration values
-NUM_PRODUCTS = config["data_generation"]["num_products"]
-NUM_STORES = config["data_generation"]["num_stores"]
-NUM_CUSTOMERS = config["data_generation"]["num_customers"]
-NUM_YEARS = config["data_generation"]["num_years"]
-START_YEAR = config["data_generation"]["start_year"]
-END_YEAR = START_YEAR + NUM_YEARS - 1
-DATE_RANGE = pd.date_range(f"{START_YEAR}-01-01", f"{END_YEAR}-12-31")
 
 # Define product names and brands for each category
 product_names = {
@@ -68,8 +114,16 @@ store_locations = [
     "New Orleans, LA", "Arlington, TX"
 ]
 
+# Membership tiers as (name, lowest Points_Earned), in ascending order
+MEMBERSHIP_TIERS = [("Silver", 0), ("Gold", 75000), ("Platinum", 80000)]
+
+# Stream identifiers mixed into the seed so feedback and loyalty draws never reuse the sales stream
+FEEDBACK_STREAM = 1
+LOYALTY_STREAM = 2
+
+@traced("generate.product", rows=len)
 def generate_product_data():
-    product_ids = [f"P{str(i).zfill(5)}" for i in range(NUM_PRODUCTS)]
+    product_ids = [f"P{str(i).zfill(5)}" for i in range(get_settings()["num_products"])]
     categories = list(product_names.keys())
     product_data = []
     for pid in product_ids:
@@ -86,8 +140,14 @@ def generate_product_data():
                                  "Supplier_ID"])
 
 
+def _store_ids():
+    """IDs of the stores generate_store_data creates: one per location, at most num_stores."""
+    return [f"S{str(i).zfill(3)}" for i in range(min(get_settings()["num_stores"], len(store_locations)))]
+
+
+@traced("generate.store", rows=len)
 def generate_store_data():
-    store_ids = [f"S{str(i).zfill(3)}" for i in range(NUM_STORES)]
+    store_ids = _store_ids()
     store_types = ["Warehouse", "Retail Outlet"]
     store_data = []
     for sid, location in zip(store_ids, store_locations):
@@ -97,16 +157,19 @@ def generate_store_data():
     return pd.DataFrame(store_data, columns=["Store_ID", "Store_Location", "Store_Size", "Store_Type"])
 
 
+@traced("generate.customer", rows=len)
 def generate_customer_data():
+    settings = get_settings()
+    num_customers = settings["num_customers"]
     customer_data = []
     existing_customer_ids = set()
 
-    for year in range(START_YEAR, END_YEAR + 1):
-        new_customer_ids = [f"C{str(i + year * NUM_CUSTOMERS).zfill(4)}" for i in
-                            range(int(NUM_CUSTOMERS * 0.6))]  # 60% new customers each year
+    for year in range(settings["start_year"], settings["end_year"] + 1):
+        new_customer_ids = [f"C{str(i + year * num_customers).zfill(4)}" for i in
+                            range(int(num_customers * 0.6))]  # 60% new customers each year
         num_existing_customers = len(existing_customer_ids)
         if num_existing_customers > 0:
-            retained_customer_ids = random.sample(list(existing_customer_ids), min(int(NUM_CUSTOMERS * 0.4),
+            retained_customer_ids = random.sample(list(existing_customer_ids), min(int(num_customers * 0.4),
                                                                                    num_existing_customers))  # 40% retained customers from previous years
         else:
             retained_customer_ids = []
@@ -138,9 +201,10 @@ def generate_customer_data():
                         columns=["Customer_ID", "First_Name", "Last_Name", "Email", "Phone", "Address", "City", "State",
                                  "Zip_Code", "Customer_Join_Date", "DOB", "Gender"])
 
+@traced("generate.time", rows=len)
 def generate_time_data():
     time_data = []
-    for single_date in DATE_RANGE:
+    for single_date in get_settings()["date_range"]:
         day_of_week = single_date.strftime("%A")
         week_of_year = single_date.isocalendar()[1]
         month = single_date.strftime("%B")
@@ -150,37 +214,253 @@ def generate_time_data():
     return pd.DataFrame(time_data, columns=["Date", "Day_of_Week", "Week_of_Year", "Month", "Quarter", "Year"])
 
 
-def generate_sales_data(product_df, customer_ids):
-    sales_data = []
-    for single_date in DATE_RANGE:
-        day_of_week = single_date.strftime("%A")
-        month = single_date.strftime("%B")
-
-        # Adjust daily transaction volume based on the day of the week
-        if day_of_week in ["Saturday", "Sunday"]:
-            daily_transactions = random.randint(100, 300)  # Higher sales on weekends
-        else:
-            daily_transactions = random.randint(50, 150)
-
-        for _ in range(daily_transactions):
-            transaction_id = f"T{str(len(sales_data) + 1).zfill(7)}"
-            product_id = random.choice(product_df['Product_ID'].tolist())
-            store_id = random.choice(store_locations)
-            customer_id = random.choice(customer_ids)
-
-            # Adjust quantity sold based on the season (e.g., higher sales in December)
-            if month in ["November", "December"]:
-                quantity_sold = random.randint(2, 15)  # Higher sales during holiday season
-            else:
-                quantity_sold = random.randint(1, 10)
-
-            sales_amount = quantity_sold * product_df.loc[product_df['Product_ID'] == product_id, 'Price'].values[0]
-            sales_data.append(
-                [transaction_id, product_id, store_id, customer_id, single_date, quantity_sold, round(sales_amount, 2)])
-    return pd.DataFrame(sales_data,
-                        columns=["Transaction_ID", "Product_ID", "Store_ID", "Customer_ID", "Date", "Quantity_Sold",
-                                 "Sales_Amount"])
-
+def _product_keys(product_df):
+    """Return the product IDs or, for a compact product table, its surrogate keys, and whether it is compact."""
+    if "Product_Key" in product_df:
+        return product_df["Product_Key"].to_numpy(), True
+    return product_df["Product_ID"].to_numpy(), False
+
+
+def _store_keys(store_ids, compact):
+    """Return the store IDs (or, compact, keys) sales are drawn from, defaulting to the store dimension's."""
+    if store_ids is None:
+        store_ids = _store_ids()
+        return encode_ids(store_ids, "Store_ID") if compact else np.asarray(store_ids)
+    return np.asarray(store_ids)
+
+
+def _id_column(df, name):
+    """Name of the Customer/Product/... column of a table in either layout ("Customer_ID" or "Customer_Key")."""
+    return f"{name}_Key" if f"{name}_Key" in df else f"{name}_ID"
+
+
+def _format_ids(prefix, start, count, width):
+    """Vectorized equivalent of f"{prefix}{str(i).zfill(width)}" for i in [start, start + count)."""
+    numbers = np.arange(start, start + count).astype("U")
+    return np.char.add(prefix, np.char.zfill(numbers, width))
+
+
+def _draw_daily_transactions(rng, date_range):
+    """Draw the number of transactions per day; always the first draw made from a block's generator."""
+    # Adjust daily transaction volume based on the day of the week (higher sales on weekends)
+    weekend = np.asarray(date_range.dayofweek >= 5)
+    return rng.integers(np.where(weekend, 100, 50), np.where(weekend, 301, 151))
+
+
+def _generate_sales_block(rng, date_range, product_ids, prices, store_ids, customer_ids, start_id, compact=False):
+    """
+    Draw all transactions for the given dates, numbering them from start_id.
+
+    With compact, product_ids, store_ids and customer_ids are int32 surrogate keys and the block gets
+    *_Key columns (see src.data.compact); the draws are the same in both layouts.
+    """
+    daily_transactions = _draw_daily_transactions(rng, date_range)
+    day_idx = np.repeat(np.arange(len(date_range)), daily_transactions)
+    num_transactions = len(day_idx)
+
+    product_idx = rng.integers(0, len(product_ids), num_transactions)
+    store_idx = rng.integers(0, len(store_ids), num_transactions)
+    customer_idx = rng.integers(0, len(customer_ids), num_transactions)
+
+    # Adjust quantity sold based on the season (higher sales during the November/December holidays)
+    holiday = np.isin(np.asarray(date_range.month), [11, 12])[day_idx]
+    quantity_sold = rng.integers(np.where(holiday, 2, 1), np.where(holiday, 16, 11))
+
+    sales_amount = np.round(quantity_sold * prices[product_idx], 2)
+    if compact:
+        return pd.DataFrame({
+            "Transaction_Key": np.arange(start_id, start_id + num_transactions, dtype=np.int32),
+            "Product_Key": product_ids[product_idx],
+            "Store_Key": store_ids[store_idx],
+            "Customer_Key": customer_ids[customer_idx],
+            "Date": np.asarray(date_range.values)[day_idx],
+            "Quantity_Sold": quantity_sold.astype(np.int32),
+            "Sales_Amount": sales_amount
+        })
+    return pd.DataFrame({
+        "Transaction_ID": _format_ids("T", start_id, num_transactions, 7),
+        "Product_ID": product_ids[product_idx],
+        "Store_ID": store_ids[store_idx],
+        "Customer_ID": np.asarray(customer_ids)[customer_idx],
+        "Date": np.asarray(date_range.values)[day_idx],
+        "Quantity_Sold": quantity_sold,
+        "Sales_Amount": sales_amount
+    })
+
+
+@traced("generate.sales", rows=len)
+def generate_sales_data(product_df, customer_ids, date_range=None, seed=None, store_ids=None):
+    """
+    Generate sales transactions as batched NumPy draws instead of a per-transaction Python loop.
+
+    Daily counts, product/store/customer indices and seasonal quantities are drawn as whole
+    arrays and prices are joined through an index lookup, so the cost is linear in the number
+    of transactions and independent of the number of products.
+
+    :param product_df: Product DataFrame with Product_ID (or, compact, Product_Key) and Price columns.
+    :param customer_ids: Sequence of customer IDs (or, compact, customer keys) to draw buyers from.
+    :param date_range: Dates to generate sales for (defaults to the configured date range).
+    :param seed: Seed for the generator; the same seed always yields the same output.
+    :param store_ids: Store IDs (or, compact, store keys) to draw from (defaults to those of generate_store_data).
+    :return: Sales DataFrame.
+    """
+    settings = get_settings()
+    date_range = settings["date_range"] if date_range is None else date_range
+    rng = np.random.default_rng(settings["seed"] if seed is None else seed)
+    product_ids, compact = _product_keys(product_df)
+    return _generate_sales_block(rng, date_range, product_ids, product_df['Price'].to_numpy(dtype=np.float64),
+                                 _store_keys(store_ids, compact), np.asarray(customer_ids), 1, compact)
+
+
+def _plan_shards(date_range, chunk_freq, seed):
+    """
+    Split the date range into calendar-period shards with their own seeds and transaction ID offsets.
+
+    Each shard's seed is derived from the base seed and the period itself, never from the order in
+    which shards run, and the daily counts (the first draw from that seed) fix every shard's ID
+    range up front. Shards can therefore be generated in any process and still give the same rows.
+    """
+    periods = date_range.to_period(chunk_freq)
+    shards = []
+    next_id = 1
+    for period in periods.unique():
+        dates = date_range[periods == period]
+        seed_seq = np.random.SeedSequence([seed, period.ordinal])
+        num_transactions = int(_draw_daily_transactions(np.random.default_rng(seed_seq), dates).sum())
+        shards.append((dates, seed_seq, next_id))
+        next_id += num_transactions
+    return shards
+
+
+def _generate_shard(task):
+    """Generate the sales (and optionally feedback) of one shard; runs in a worker process."""
+    dates, seed_seq, start_id, product_ids, prices, store_ids, customer_ids, with_feedback, compact = task
+    sales_df = _generate_sales_block(np.random.default_rng(seed_seq), dates, product_ids, prices, store_ids,
+                                     customer_ids, start_id, compact)
+    feedback_df = None
+    if with_feedback:
+        feedback_df = generate_feedback_data(sales_df, rng=np.random.default_rng([*seed_seq.generate_state(2),
+                                                                                   FEEDBACK_STREAM]))
+    return sales_df, feedback_df
+
+
+def iter_sales_shards(product_df, customer_ids, chunk_freq="M", date_range=None, seed=None, with_feedback=False,
+                      workers=1, store_ids=None):
+    """
+    Yield (sales_df, feedback_df) per calendar-period shard, optionally generated on a process pool.
+
+    Shards are yielded in date order and their content depends only on the base seed and the
+    period, so the output is identical for any number of workers. Feedback IDs are renumbered
+    here so they stay sequential across shards. At most 2 * workers shards are in flight at once.
+
+    :param product_df: Product DataFrame with Product_ID and Price columns.
+    :param customer_ids: Sequence of customer IDs to draw buyers from.
+    :param chunk_freq: Pandas period alias used to split the date range (e.g. "M", "W", "D").
+    :param date_range: Dates to generate sales for (defaults to the configured date range).
+    :param seed: Base seed every shard seed is derived from.
+    :param with_feedback: Whether to derive feedback for each shard (otherwise feedback_df is None).
+    :param workers: Number of worker processes; 1 generates shards in the calling process.
+    :param store_ids: Store IDs (or, compact, store keys) to draw from (defaults to those of generate_store_data).
+    :return: Iterator of (sales_df, feedback_df) tuples.
+    """
+    settings = get_settings()
+    date_range = settings["date_range"] if date_range is None else date_range
+    product_ids, compact = _product_keys(product_df)
+    prices = product_df['Price'].to_numpy(dtype=np.float64)
+    store_ids = _store_keys(store_ids, compact)
+    customer_ids = np.asarray(customer_ids)
+    shards = _plan_shards(date_range, chunk_freq, settings["seed"] if seed is None else seed)
+    tasks = [(dates, seed_seq, start_id, product_ids, prices, store_ids, customer_ids, with_feedback, compact)
+             for dates, seed_seq, start_id in shards]
+
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        pending = deque()
+
+        def results():
+            for task in tasks:
+                pending.append(executor.submit(_generate_shard, task))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+    else:
+        executor = None
+
+        def results():
+            for task in tasks:
+                yield _generate_shard(task)
+
+    next_feedback_id = 1
+    try:
+        for sales_df, feedback_df in results():
+            if feedback_df is not None:
+                if compact:
+                    feedback_df["Feedback_Key"] = np.arange(next_feedback_id, next_feedback_id + len(feedback_df),
+                                                            dtype=np.int32)
+                else:
+                    feedback_df["Feedback_ID"] = _format_ids("FB", next_feedback_id, len(feedback_df), 7)
+                next_feedback_id += len(feedback_df)
+            yield sales_df, feedback_df
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def _split_rows(df, max_rows):
+    """Yield consecutive slices of df with at most max_rows rows each."""
+    step = max_rows or max(len(df), 1)
+    for offset in range(0, len(df), step):
+        yield df.iloc[offset:offset + step].reset_index(drop=True)
+
+
+def iter_sales_chunks(product_df, customer_ids, chunk_freq="M", max_chunk_rows=None, date_range=None, seed=None,
+                      workers=1, store_ids=None):
+    """
+    Yield sales transactions in bounded chunks instead of one DataFrame for the whole date range.
+
+    Each calendar period (a month by default) is generated as its own shard and optionally split
+    further into slices of at most max_chunk_rows rows. Transaction IDs continue across chunks.
+
+    :param product_df: Product DataFrame with Product_ID and Price columns.
+    :param customer_ids: Sequence of customer IDs to draw buyers from.
+    :param chunk_freq: Pandas period alias used to split the date range (e.g. "M", "W", "D").
+    :param max_chunk_rows: Optional upper bound on the number of rows per yielded chunk.
+    :param date_range: Dates to generate sales for (defaults to the configured date range).
+    :param seed: Seed for the generator; the same seed always yields the same chunks.
+    :param workers: Number of worker processes generating shards.
+    :param store_ids: Store IDs (or, compact, store keys) to draw from (defaults to those of generate_store_data).
+    :return: Iterator of sales DataFrames.
+    """
+    for sales_df, _ in iter_sales_shards(product_df, customer_ids, chunk_freq, date_range, seed, workers=workers,
+                                         store_ids=store_ids):
+        yield from _split_rows(sales_df, max_chunk_rows)
+
+
+@traced("generate.sharded", rows=lambda result: len(result[0]))
+def generate_sharded_data(product_df, customer_ids, workers=None, chunk_freq="M", date_range=None, seed=None,
+                          store_ids=None):
+    """
+    Generate sales and feedback across a process pool and merge the shards.
+
+    :param product_df: Product DataFrame with Product_ID and Price columns.
+    :param customer_ids: Sequence of customer IDs to draw buyers from.
+    :param workers: Number of worker processes (defaults to data_generation.workers).
+    :param chunk_freq: Pandas period alias defining the shards.
+    :param date_range: Dates to generate sales for (defaults to the configured date range).
+    :param seed: Base seed every shard seed is derived from.
+    :param store_ids: Store IDs (or, compact, store keys) to draw from (defaults to those of generate_store_data).
+    :return: Tuple of (sales_df, feedback_df).
+    """
+    sales_parts, feedback_parts = [], []
+    for sales_df, feedback_df in iter_sales_shards(product_df, customer_ids, chunk_freq, date_range, seed,
+                                                   with_feedback=True, workers=workers or get_settings()["workers"],
+                                                   store_ids=store_ids):
+        sales_parts.append(sales_df)
+        feedback_parts.append(feedback_df)
+    return pd.concat(sales_parts, ignore_index=True), pd.concat(feedback_parts, ignore_index=True)
+
+@traced("generate.supplier", rows=len)
 def generate_supplier_data():
     supplier_ids = list(set([f"SUP{str(random.randint(1, 50))}" for _ in range(50)]))
     supplier_data = []
@@ -194,43 +474,105 @@ def generate_supplier_data():
                         columns=["Supplier_ID", "Supplier_Name", "Contact_Number", "Email", "Lead_Time_Days"])
 
 
-def generate_feedback_data(sales_df):
-    feedback_text_to_rating = config["feedback"]["texts"]
-
-    feedback_data = []
-    for _, row in sales_df.iterrows():
-        if random.random() < config["feedback"]["chance"]:  # 10% chance of feedback
-            feedback_id = f"FB{str(len(feedback_data) + 1).zfill(7)}"
-            feedback_date = row['Date'] + timedelta(days=random.randint(1, 30))
-            feedback_text = random.choice(list(feedback_text_to_rating.keys()))
-            feedback_rating = feedback_text_to_rating[feedback_text]
-            feedback_data.append(
-                [feedback_id, row['Product_ID'], row['Customer_ID'], feedback_date, feedback_text, feedback_rating])
-    return pd.DataFrame(feedback_data, columns=["Feedback_ID", "Product_ID", "Customer_ID", "Date", "Feedback_Text",
-                                                "Feedback_Rating"])
+@traced("generate.feedback", rows=len)
+def generate_feedback_data(sales_df, start_id=1, seed=None, rng=None):
+    """
+    Derive customer feedback for a random subset of sales transactions with batched NumPy draws.
+
+    A Bernoulli mask with probability feedback.chance picks the transactions that get feedback;
+    the date offsets (1-30 days after the sale) and feedback texts are then drawn as whole arrays
+    and ratings are looked up by text index.
+
+    :param sales_df: Sales DataFrame with Product_ID, Customer_ID and Date columns (or, compact,
+                     Product_Key and Customer_Key, giving compact feedback).
+    :param start_id: Number of the first Feedback_ID.
+    :param seed: Seed for the generator (defaults to the configured seed).
+    :param rng: Optional numpy Generator to draw from instead of seeding a new one.
+    :return: Feedback DataFrame.
+    """
+    feedback_config = get_config()["feedback"]
+    feedback_texts = np.array(list(feedback_config["texts"].keys()), dtype=object)
+    feedback_ratings = np.array(list(feedback_config["texts"].values()), dtype=np.float64)
+    if rng is None:
+        rng = np.random.default_rng([get_settings()["seed"] if seed is None else seed, FEEDBACK_STREAM])
+
+    selected = rng.random(len(sales_df)) < feedback_config["chance"]
+    num_feedback = int(selected.sum())
+    day_offsets = rng.integers(1, 31, num_feedback).astype("timedelta64[D]")
+    text_idx = rng.integers(0, len(feedback_texts), num_feedback)
+    product_column, customer_column = _id_column(sales_df, "Product"), _id_column(sales_df, "Customer")
+    if customer_column == "Customer_Key":
+        id_column = "Feedback_Key"
+        feedback_ids = np.arange(start_id, start_id + num_feedback, dtype=np.int32)
+        # Fixed categories so every shard's codes match the dim_feedback_text lookup table
+        texts = pd.Categorical.from_codes(text_idx, categories=feedback_texts)
+    else:
+        id_column = "Feedback_ID"
+        feedback_ids = _format_ids("FB", start_id, num_feedback, 7).astype(object)
+        texts = feedback_texts[text_idx]
+    return pd.DataFrame({
+        id_column: feedback_ids,
+        product_column: sales_df[product_column].to_numpy()[selected],
+        customer_column: sales_df[customer_column].to_numpy()[selected],
+        "Date": pd.to_datetime(sales_df["Date"]).to_numpy()[selected] + day_offsets,
+        "Feedback_Text": texts,
+        "Feedback_Rating": feedback_ratings[text_idx]
+    })
+
+
+@traced("generate.loyalty", rows=len)
+def calculate_loyalty_points(sales_df, seed=None, rng=None):
+    """
+    Derive the loyalty table from each customer's total spending.
+
+    Points earned equal total spending, points redeemed are drawn uniformly between 0 and half of
+    the points earned, and tiers are assigned by bucketing points earned against MEMBERSHIP_TIERS.
+
+    :param sales_df: DataFrame with Customer_ID (or, compact, Customer_Key) and Sales_Amount columns
+                     (transactions or per-customer totals).
+    :param seed: Seed for the generator (defaults to the configured seed).
+    :param rng: Optional numpy Generator to draw from instead of seeding a new one.
+    :return: Loyalty DataFrame.
+    """
+    if rng is None:
+        rng = np.random.default_rng([get_settings()["seed"] if seed is None else seed, LOYALTY_STREAM])
 
-
-def calculate_loyalty_points(sales_df):
     # Calculate Loyalty Points based on Purchase History
-    sales_summary = sales_df.groupby("Customer_ID")["Sales_Amount"].sum().reset_index()
-    sales_summary["Points_Earned"] = sales_summary["Sales_Amount"]
-    sales_summary["Points_Redeemed"] = sales_summary["Points_Earned"].apply(lambda x: random.randint(0, int(x * 0.5)))
-    sales_summary["Membership_Tier"] = sales_summary["Points_Earned"].apply(
-        lambda x: "Silver" if x < 75000 else "Gold" if x < 80000 else "Platinum")
+    customer_column = _id_column(sales_df, "Customer")
+    sales_summary = sales_df.groupby(customer_column)["Sales_Amount"].sum()
+    points_earned = sales_summary.to_numpy(dtype=np.float64)
+    points_redeemed = rng.integers(0, np.floor(points_earned * 0.5).astype(np.int64), endpoint=True)
+    tier_names = np.array([name for name, _ in MEMBERSHIP_TIERS], dtype=object)
+    tier_bounds = [lower_bound for _, lower_bound in MEMBERSHIP_TIERS[1:]]
+    tier_idx = np.searchsorted(tier_bounds, points_earned, side="right")
 
     # Generate Loyalty Program Data
-    loyalty_data = []
-    for _, row in sales_summary.iterrows():
-        loyalty_id = f"LOY{str(len(loyalty_data) + 1).zfill(7)}"
-        loyalty_data.append(
-            [loyalty_id, row["Customer_ID"], row["Points_Earned"], row["Points_Redeemed"], row["Membership_Tier"]])
-
-    return pd.DataFrame(loyalty_data,
-                        columns=["Loyalty_ID", "Customer_ID", "Points_Earned", "Points_Redeemed", "Membership_Tier"])
-
-
-def main():
-    # Generate data
+    if customer_column == "Customer_Key":
+        return pd.DataFrame({
+            "Loyalty_Key": np.arange(1, len(sales_summary) + 1, dtype=np.int32),
+            "Customer_Key": sales_summary.index.to_numpy(dtype=np.int32),
+            "Points_Earned": points_earned,
+            "Points_Redeemed": points_redeemed,
+            "Membership_Tier": pd.Categorical.from_codes(tier_idx, categories=tier_names)
+        })
+    return pd.DataFrame({
+        "Loyalty_ID": _format_ids("LOY", 1, len(sales_summary), 7).astype(object),
+        "Customer_ID": sales_summary.index.to_numpy(),
+        "Points_Earned": points_earned,
+        "Points_Redeemed": points_redeemed,
+        "Membership_Tier": tier_names[tier_idx]
+    })
+
+
+def generate_dataframes():
+    """
+    Generate every table as a pandas DataFrame.
+
+    With data_generation.compact, tables use the compact layout of src.data.compact: int32
+    surrogate keys instead of string IDs and categoricals for labels.
+
+    :return: Dictionary of table name to pandas DataFrame.
+    """
     print("Generating Product Data...")
     product_df = generate_product_data()
 
@@ -243,42 +585,124 @@ def main():
     print("Generating Time Data...")
     time_df = generate_time_data()
 
-    print("Generating Sales Data...")
-    sales_df = generate_sales_data(product_df, customer_df['Customer_ID'].tolist())
-
     print("Generating Supplier Data...")
     supplier_df = generate_supplier_data()
 
-    print("Generating Feedback Data...")
-    feedback_df = generate_feedback_data(sales_df)
+    if get_settings()["compact"]:
+        # Sales, feedback and loyalty follow: they are generated with keys straight away
+        print("Converting Dimension Data to the compact layout...")
+        product_df, store_df, customer_df, time_df, supplier_df = (
+            compact_frame(df, table_name) for df, table_name in
+            [(product_df, "product_sdf"), (store_df, "store_sdf"), (customer_df, "customer_sdf"),
+             (time_df, "time_sdf"), (supplier_df, "supplier_sdf")])
+    customer_ids = customer_df[_id_column(customer_df, "Customer")].to_numpy()
+    store_ids = store_df[_id_column(store_df, "Store")].to_numpy()
+
+    # Always sharded, so the tables match main_streaming and do not depend on the worker count
+    num_workers = get_settings()["workers"]
+    print(f"Generating Sales and Feedback Data on {num_workers} worker(s)...")
+    sales_df, feedback_df = generate_sharded_data(product_df, customer_ids, workers=num_workers, store_ids=store_ids)
 
     print("Calculating Loyalty Points based on Purchase History...")
     loyalty_df = calculate_loyalty_points(sales_df)
 
-    print("Converting DataFrames to Spark DataFrames...")
-    # Convert pandas DataFrames to Spark DataFrames
-    product_sdf = spark.createDataFrame(product_df)
-    store_sdf = spark.createDataFrame(store_df)
-    customer_sdf = spark.createDataFrame(customer_df)
-    time_sdf = spark.createDataFrame(time_df)
-    sales_sdf = spark.createDataFrame(sales_df)
-    supplier_sdf = spark.createDataFrame(supplier_df)
-    feedback_sdf = spark.createDataFrame(feedback_df)
-    loyalty_sdf = spark.createDataFrame(loyalty_df)
-
-    # Return all Spark DataFrames
     return {
-        "product_sdf": product_sdf,
-        "store_sdf": store_sdf,
-        "customer_sdf": customer_sdf,
-        "time_sdf": time_sdf,
-        "sales_sdf": sales_sdf,
-        "supplier_sdf": supplier_sdf,
-        "feedback_sdf": feedback_sdf,
-        "loyalty_sdf": loyalty_sdf
+        "product_sdf": product_df,
+        "store_sdf": store_df,
+        "customer_sdf": customer_df,
+        "time_sdf": time_df,
+        "sales_sdf": sales_df,
+        "supplier_sdf": supplier_df,
+        "feedback_sdf": feedback_df,
+        "loyalty_sdf": loyalty_df
     }
 
 
+def main():
+    configure_instrumentation(get_config())
+
+    # Generate data
+    dataframes = generate_dataframes()
+    if get_settings()["compact"]:
+        dataframes = storage_tables(dataframes)
+
+    print("Converting DataFrames to Spark DataFrames...")
+    # Convert pandas DataFrames to Spark DataFrames through Arrow with schemas from the config
+    spark = get_spark()
+    spark_dataframes = {}
+    for table_name, df in dataframes.items():
+        with span("convert.to_spark", rows=len(df)):
+            spark_dataframes[table_name], seconds = pandas_to_spark(spark, df, table_name,
+                                                                    get_config()["data_table_schemas"])
+        print(f"Converted {table_name} ({len(df)} rows) in {seconds:.2f}s")
+    return spark_dataframes
+
+
+def main_streaming(sink, chunk_freq=None, max_chunk_rows=None, workers=None):
+    """
+    Generate all tables and write them to a sink chunk by chunk.
+
+    Sales and the feedback derived from them are never materialized for the full date range;
+    only per-customer spending totals are kept in memory to derive the loyalty table at the end,
+    so peak memory stays flat regardless of num_years and daily volume.
+
+    With data_generation.compact, tables are written in the compact layout (see
+    src.data.compact): categorical codes in the tables and each lookup table written once.
+
+    :param sink: Object with write(table_name, df) and close() methods (see src.data.data_sinks).
+    :param chunk_freq: Pandas period alias for each chunk (defaults to streaming.chunk_freq).
+    :param max_chunk_rows: Maximum rows per chunk (defaults to streaming.max_chunk_rows).
+    :param workers: Number of worker processes generating shards (defaults to data_generation.workers).
+    """
+    configure_instrumentation(get_config())
+    streaming_config = get_config().get("streaming", {})
+    chunk_freq = chunk_freq or streaming_config.get("chunk_freq", "M")
+    max_chunk_rows = max_chunk_rows or streaming_config.get("max_chunk_rows")
+    compact = get_settings()["compact"]
+    if compact:
+        sink = CompactSink(sink)
+
+    def dimension(df, table_name):
+        return compact_frame(df, table_name) if compact else df
+
+    print("Generating Product Data...")
+    product_df = dimension(generate_product_data(), "product_sdf")
+    sink.write("product_sdf", product_df)
+
+    print("Generating Store Data...")
+    store_df = dimension(generate_store_data(), "store_sdf")
+    sink.write("store_sdf", store_df)
+
+    print("Generating Customer Data...")
+    customer_df = dimension(generate_customer_data(), "customer_sdf")
+    sink.write("customer_sdf", customer_df)
+
+    print("Generating Time Data...")
+    sink.write("time_sdf", dimension(generate_time_data(), "time_sdf"))
+
+    print("Generating Supplier Data...")
+    sink.write("supplier_sdf", dimension(generate_supplier_data(), "supplier_sdf"))
+
+    print("Streaming Sales and Feedback Data...")
+    customer_column = _id_column(customer_df, "Customer")
+    customer_totals = pd.Series(dtype=np.float64)
+    for sales_df, feedback_df in iter_sales_shards(product_df, customer_df[customer_column].to_numpy(), chunk_freq,
+                                                   with_feedback=True, workers=workers or get_settings()["workers"],
+                                                   store_ids=store_df[_id_column(store_df, "Store")].to_numpy()):
+        for sales_chunk in _split_rows(sales_df, max_chunk_rows):
+            sink.write("sales_sdf", sales_chunk)
+        for feedback_chunk in _split_rows(feedback_df, max_chunk_rows):
+            sink.write("feedback_sdf", feedback_chunk)
+
+        chunk_totals = sales_df.groupby(customer_column)["Sales_Amount"].sum()
+        customer_totals = customer_totals.add(chunk_totals, fill_value=0.0)
+
+    print("Calculating Loyalty Points based on Purchase History...")
+    sales_summary = customer_totals.rename("Sales_Amount").rename_axis(customer_column).reset_index()
+    sink.write("loyalty_sdf", calculate_loyalty_points(sales_summary))
+    sink.close()
+
+
 if __name__ == "__main__":
     dataframes = main()
     print("Data generation complete.")
@@ -1,5 +1,9 @@
-from src.utils.spark_utils import load_config, initialize_spark, insert_dataframe_to_sqlite
-from data_generation import main as generate_data
+from src.utils.spark_utils import get_config, get_spark, insert_dataframe_to_sqlite, pandas_to_spark
+from src.data.database_operations import bulk_insert_dataframe_to_sqlite, create_indexes
+from src.data.compact import create_wide_views, storage_tables
+from src.utils.instrumentation import configure_instrumentation, span
+from data_generation import generate_dataframes, main_streaming as stream_data
+from data_sinks import create_sink
 import os
 
 # Set environment variables for Python version consistency
@@ -7,16 +11,50 @@ os.environ["PYSPARK_PYTHON"] = "/opt/anaconda3/bin/python3"
 os.environ["PYSPARK_DRIVER_PYTHON"] = "/opt/anaconda3/bin/python3"
 
 # Load configuration
-config = load_config()
+config = get_config()
+configure_instrumentation(config)
+compact = config["data_generation"].get("compact", False)
 
-# Initialize Spark session
-spark = initialize_spark(config["spark"]["app_name"], config["spark"]["jdbc_driver_path"])
+streaming_config = config.get("streaming", {})
+streaming = streaming_config.get("enabled", False)
+if streaming:
+    # Stream generated chunks straight to the sink without building full tables in memory
+    stream_data(create_sink(streaming_config, config['database']['path']))
+else:
+    # Generate dataframes
+    dataframes = generate_dataframes()
+    if compact:
+        # Categorical columns are stored as codes next to their dim_<column> lookup tables
+        dataframes = storage_tables(dataframes)
 
-# Generate dataframes
-dataframes = generate_data()
+    # Pick the loader for each table: "spark" (JDBC writer) or "native" (direct sqlite3 bulk insert)
+    loader_config = config.get("loader", {})
+    loaders = {table_name: loader_config.get("tables", {}).get(table_name, loader_config.get("default", "spark"))
+               for table_name in dataframes}
 
-# Insert data into each table using the Spark utility function
-for table_name, sdf in dataframes.items():
-    insert_dataframe_to_sqlite(sdf, table_name, config['database']['path'], "org.sqlite.JDBC")
+    load_reports = []
+    for table_name, df in dataframes.items():
+        if loaders[table_name] == "native":
+            load_reports.append(bulk_insert_dataframe_to_sqlite(
+                df, table_name, config['database']['path'],
+                batch_size=loader_config.get("batch_size", 50000),
+                pragmas=loader_config.get("pragmas")))
+        else:
+            # Spark only starts when the first table goes through the JDBC writer
+            with span("spark.jdbc_insert", rows=len(df)):
+                sdf, _ = pandas_to_spark(get_spark(), df, table_name, config["data_table_schemas"])
+                insert_dataframe_to_sqlite(sdf, table_name, config['database']['path'], "org.sqlite.JDBC")
+
+    for report in load_reports:
+        print(f"{report['table']}: {report['rows']} rows in {report['seconds']}s ({report['rows_per_sec']} rows/sec)")
+
+# A CSV sink leaves the database untouched; indexing it would only create an empty file
+if not streaming or streaming_config.get("sink", "sqlite") == "sqlite":
+    # Build the secondary indexes once all rows are in, then refresh the planner statistics
+    index_config = config.get("indexes", {})
+    create_indexes(config['database']['path'], index_config.get("tables", {}), index_config.get("analysis_limit"))
+    if compact:
+        # Readers that need the string IDs and labels query <table>_wide
+        create_wide_views(config['database']['path'])
 
 print("All tables populated successfully.")
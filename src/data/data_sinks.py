@@ -0,0 +1,80 @@
+import os
+import sqlite3
+from src.data.database_operations import format_stored_dates
+from src.utils.instrumentation import span
+
+
+class SQLiteChunkSink:
+    """Append generated DataFrame chunks to tables in an SQLite database."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.rows_written = {}
+
+    def write(self, table_name: str, df):
+        """
+        Append a pandas DataFrame chunk to a table, creating it on first write.
+
+        :param table_name: The name of the table to append to.
+        :param df: The pandas DataFrame chunk.
+        """
+        if df.empty:
+            return
+        # Dates go in as the same ISO text the loaders write
+        date_columns = [column for column, dtype in df.dtypes.items() if dtype.kind == "M"]
+        if date_columns:
+            df = df.assign(**{column: format_stored_dates(df[column]) for column in date_columns})
+        with span("sink.sqlite", rows=len(df)):
+            df.to_sql(table_name, self.conn, if_exists="append", index=False)
+            self.conn.commit()
+        self.rows_written[table_name] = self.rows_written.get(table_name, 0) + len(df)
+
+    def close(self):
+        """Close the database connection."""
+        self.conn.close()
+        print(f"Rows written to {self.db_path}: {self.rows_written}")
+
+
+class CSVChunkSink:
+    """Append generated DataFrame chunks to one CSV file per table."""
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self.rows_written = {}
+
+    def write(self, table_name: str, df):
+        """
+        Append a pandas DataFrame chunk to <output_dir>/<table_name>.csv, writing the header once.
+
+        :param table_name: The name of the table (file) to append to.
+        :param df: The pandas DataFrame chunk.
+        """
+        if df.empty:
+            return
+        file_path = os.path.join(self.output_dir, f"{table_name}.csv")
+        first_write = table_name not in self.rows_written
+        with span("sink.csv", rows=len(df)):
+            df.to_csv(file_path, mode="w" if first_write else "a", header=first_write, index=False)
+        self.rows_written[table_name] = self.rows_written.get(table_name, 0) + len(df)
+
+    def close(self):
+        """Report the rows written per table."""
+        print(f"Rows written to {self.output_dir}: {self.rows_written}")
+
+
+def create_sink(streaming_config, db_path):
+    """
+    Create the chunk sink selected in the streaming configuration.
+
+    :param streaming_config: The "streaming" section of the configuration.
+    :param db_path: Path to the SQLite database used by the "sqlite" sink.
+    :return: A sink object with write(table_name, df) and close() methods.
+    """
+    sink_type = streaming_config.get("sink", "sqlite")
+    if sink_type == "sqlite":
+        return SQLiteChunkSink(db_path)
+    if sink_type == "csv":
+        return CSVChunkSink(streaming_config["output_dir"])
+    raise ValueError(f"Unknown streaming sink: {sink_type}")
@@ -1,6 +1,11 @@
 import sqlite3
 import json
-from typing import List, Tuple
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Tuple
+from src.utils.instrumentation import traced
 
 
 # Load configuration from JSON file
@@ -10,22 +15,177 @@ def load_config(config_path='config/config.json'):
     return config
 
 
+def _query_preview(query: str, max_length: int = 200) -> str:
+    """Shorten a query for progress messages so long statements do not flood stdout."""
+    query = " ".join(query.split())
+    return query if len(query) <= max_length else query[:max_length] + "..."
+
+
+class SQLiteConnectionManager:
+    """
+    Thread-safe manager handing out one reusable connection per thread for an SQLite database.
+
+    Connections run with a busy timeout and a per-connection prepared-statement cache, and are
+    kept open for the life of the manager. Write transactions are started with BEGIN IMMEDIATE so
+    the write lock is taken up front; time spent waiting for it is counted. The database's journal
+    mode is left alone unless wal is set: WAL is stored in the database file, so it is only
+    switched on for databases with concurrent writers (see enable_wal).
+    """
+
+    def __init__(self, db_path: str, busy_timeout_ms: int = 5000, cached_statements: int = 256,
+                 lock_wait_threshold: float = 0.005, wal: bool = False):
+        self.db_path = db_path
+        self.wal = wal
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self.lock_wait_threshold = lock_wait_threshold
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._stats = {"connections_opened": 0, "connections_reused": 0, "transactions": 0,
+                       "lock_waits": 0, "lock_wait_seconds": 0.0}
+
+    def _increment(self, name: str, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        Return the calling thread's connection, opening it on first use.
+
+        :return: An sqlite3 connection in autocommit mode (transactions are explicit).
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._increment("connections_reused")
+            return conn
+
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000, isolation_level=None,
+                               check_same_thread=False, cached_statements=self.cached_statements)
+        if self.wal:
+            conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA busy_timeout = {self.busy_timeout_ms}")
+        self._local.conn = conn
+        with self._lock:
+            self._connections.append(conn)
+            self._stats["connections_opened"] += 1
+        return conn
+
+    def enable_wal(self):
+        """Switch the database to WAL so readers and the concurrent writers do not block each other."""
+        if not self.wal:
+            self.wal = True
+            self.connection().execute("PRAGMA journal_mode = WAL")
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run a write transaction on the calling thread's connection.
+
+        Commits on success and rolls back on error.
+        """
+        conn = self.connection()
+        start_time = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        waited = time.perf_counter() - start_time
+        with self._lock:
+            self._stats["transactions"] += 1
+            if waited > self.lock_wait_threshold:
+                self._stats["lock_waits"] += 1
+                self._stats["lock_wait_seconds"] += waited
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def stats(self) -> Dict:
+        """
+        Return the connection reuse and lock wait counters.
+
+        :return: A copy of the counters.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def close_all(self):
+        """Close every connection opened by this manager."""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+_connection_managers = {}
+_connection_managers_lock = threading.Lock()
+
+
+def get_connection_manager(db_path: str, wal: bool = False) -> SQLiteConnectionManager:
+    """
+    Return the shared connection manager for a database, creating it on first use.
+
+    :param db_path: Path to the SQLite database.
+    :param wal: Switch the database to WAL mode; only for databases written by several processes or
+                threads at once (model registry, feature store).
+    :return: The SQLiteConnectionManager for that file.
+    """
+    key = os.path.abspath(db_path)
+    with _connection_managers_lock:
+        if key not in _connection_managers:
+            _connection_managers[key] = SQLiteConnectionManager(db_path)
+        manager = _connection_managers[key]
+    if wal:
+        manager.enable_wal()
+    return manager
+
+
+def close_all_connections():
+    """Close the connections of every shared connection manager."""
+    with _connection_managers_lock:
+        for manager in _connection_managers.values():
+            manager.close_all()
+        _connection_managers.clear()
+
+
+# Access patterns of the segmentation and feature code, used by SQLiteDBAdmin.index_advisor
+REPRESENTATIVE_QUERIES = {
+    "customer_rfm": "SELECT Customer_ID, MIN(Date), MAX(Date), COUNT(DISTINCT Transaction_ID), SUM(Sales_Amount) "
+                    "FROM sales_sdf GROUP BY Customer_ID",
+    "customer_history": "SELECT Date, Transaction_ID, Sales_Amount FROM sales_sdf WHERE Customer_ID = 'C10000001'",
+    "product_affinity": "SELECT s.Customer_ID, p.Category, COUNT(DISTINCT s.Transaction_ID), SUM(s.Sales_Amount) "
+                        "FROM sales_sdf AS s JOIN product_sdf AS p ON p.Product_ID = s.Product_ID "
+                        "GROUP BY s.Customer_ID, p.Category",
+    "store_loyalty": "SELECT s.Customer_ID, st.Store_Type, COUNT(DISTINCT s.Transaction_ID), SUM(s.Sales_Amount) "
+                     "FROM sales_sdf AS s JOIN store_sdf AS st ON st.Store_ID = s.Store_ID "
+                     "GROUP BY s.Customer_ID, st.Store_Type",
+    "sales_date_window": "SELECT Product_ID, SUM(Sales_Amount) FROM sales_sdf "
+                         "WHERE Date BETWEEN '2020-01-01' AND '2020-01-31' GROUP BY Product_ID",
+    "feedback_sentiment": "SELECT Customer_ID, AVG(Feedback_Rating) FROM feedback_sdf GROUP BY Customer_ID",
+    "loyalty_lookup": "SELECT Points_Earned, Points_Redeemed FROM loyalty_sdf WHERE Customer_ID = 'C10000001'"
+}
+
+
 class SQLiteDBAdmin:
     def __init__(self, db_path: str):
         self.db_path = db_path
+        self.manager = None
         self.conn = None
 
     def connect(self):
-        """Connect to the SQLite database."""
-        self.conn = sqlite3.connect(self.db_path)
+        """Connect to the SQLite database through the shared connection manager."""
+        self.manager = get_connection_manager(self.db_path)
+        self.conn = self.manager.connection()
         print(f"Connected to database: {self.db_path}")
 
     def close(self):
-        """Close the database connection."""
+        """Release the connection; it stays open in the shared manager for reuse."""
         if self.conn:
-            self.conn.close()
+            self.conn = None
             print(f"Connection to database {self.db_path} closed.")
 
+    @traced("sqlite.execute_query", rows=len)
     def execute_query(self, query: str, params: Tuple = ()) -> List[Tuple]:
         """
         Execute a query and return the results.
@@ -34,13 +194,79 @@ class SQLiteDBAdmin:
         :param params: Optional parameters for the query.
         :return: A list of tuples representing the query results.
         """
-        with self.conn:
-            cur = self.conn.cursor()
-            cur.execute(query, params)
-            results = cur.fetchall()
-            print(f"Query executed: {query}")
-            return results
+        cur = self.manager.connection().cursor()
+        cur.execute(query, params)
+        results = cur.fetchall()
+        print(f"Query executed: {_query_preview(query)}")
+        return results
+
+    def iter_query(self, query: str, params: Tuple = (), batch_size: int = 10000) -> Iterator[Tuple]:
+        """
+        Execute a query and yield its rows one at a time, fetching them in fetchmany batches.
+
+        :param query: The SQL query to execute.
+        :param params: Optional parameters for the query.
+        :param batch_size: Number of rows fetched from SQLite per round trip.
+        :return: An iterator over the result rows.
+        """
+        for rows in self._iter_fetchmany(query, params, batch_size)[1]:
+            yield from rows
 
+    def iter_query_batches(self, query: str, params: Tuple = (), batch_size: int = 10000,
+                           as_numpy: bool = False) -> Iterator:
+        """
+        Execute a query and yield its results as column batches of at most batch_size rows.
+
+        :param query: The SQL query to execute.
+        :param params: Optional parameters for the query.
+        :param batch_size: Number of rows per batch.
+        :param as_numpy: Yield dictionaries of column name to NumPy array instead of pandas DataFrames.
+        :return: An iterator over pandas DataFrames (or dictionaries of NumPy arrays).
+        """
+        # Imported here so that importing this module stays cheap for callers that never need them
+        import numpy as np
+        import pandas as pd
+
+        columns, batches = self._iter_fetchmany(query, params, batch_size)
+        for rows in batches:
+            if as_numpy:
+                yield {column: np.array(values) for column, values in zip(columns, zip(*rows))}
+            else:
+                yield pd.DataFrame.from_records(rows, columns=columns)
+
+    def _iter_fetchmany(self, query: str, params: Tuple, batch_size: int):
+        """Execute a query and return its column names and a generator of fetchmany batches."""
+        cur = self.manager.connection().cursor()
+        cur.execute(query, params)
+        print(f"Query executed (streaming): {_query_preview(query)}")
+        columns = [description[0] for description in cur.description or []]
+
+        def batches():
+            try:
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                cur.close()
+        return columns, batches()
+
+    @traced("sqlite.execute_many", rows=lambda rowcount: rowcount)
+    def execute_many(self, query: str, params_seq: Iterable[Tuple]) -> int:
+        """
+        Execute a parameterised write for every parameter tuple in a single transaction.
+
+        :param query: The SQL command to execute (e.g., INSERT INTO t VALUES (?, ?)).
+        :param params_seq: An iterable of parameter tuples; consumed lazily.
+        :return: The number of rows modified.
+        """
+        with self.manager.transaction() as conn:
+            cur = conn.executemany(query, params_seq)
+        print(f"Batch executed: {_query_preview(query)} ({cur.rowcount} rows)")
+        return cur.rowcount
+
+    @traced("sqlite.execute_non_query")
     def execute_non_query(self, query: str, params: Tuple = ()):
         """
         Execute a non-query SQL command (e.g., INSERT, UPDATE, DELETE).
@@ -48,11 +274,9 @@ class SQLiteDBAdmin:
         :param query: The SQL command to execute.
         :param params: Optional parameters for the command.
         """
-        with self.conn:
-            cur = self.conn.cursor()
-            cur.execute(query, params)
-            self.conn.commit()
-            print(f"Non-query executed: {query}")
+        with self.manager.transaction() as conn:
+            conn.execute(query, params)
+        print(f"Non-query executed: {_query_preview(query)}")
 
     def create_table(self, table_name: str, columns: List[str]):
         """
@@ -82,7 +306,7 @@ class SQLiteDBAdmin:
         :param backup_path: The path where the backup will be saved.
         """
         with sqlite3.connect(backup_path) as backup_conn:
-            self.conn.backup(backup_conn)
+            self.manager.connection().backup(backup_conn)
             print(f"Database backed up to: {backup_path}")
 
     def list_tables(self) -> List[str]:
@@ -97,6 +321,34 @@ class SQLiteDBAdmin:
         print(f"Tables in database: {table_list}")
         return table_list
 
+    def index_advisor(self, queries: Dict[str, str] = None) -> List[Dict]:
+        """
+        Run EXPLAIN QUERY PLAN on representative queries and report which ones still scan whole tables.
+
+        A plan step counts as a full scan when SQLite walks a whole table, either directly or through
+        a non-covering index (one table lookup per row); covering index scans and index searches are
+        fine. Queries whose tables do not exist are reported with the error instead.
+
+        :param queries: Dictionary of name to SQL query (defaults to REPRESENTATIVE_QUERIES).
+        :return: A list of dictionaries with the query name, plan steps, full scans and temp b-trees.
+        """
+        report = []
+        conn = self.manager.connection()
+        for name, query in (queries or REPRESENTATIVE_QUERIES).items():
+            try:
+                plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}")]
+            except sqlite3.OperationalError as e:
+                report.append({"name": name, "query": query, "error": str(e)})
+                print(f"[index advisor] {name}: {e}")
+                continue
+            full_scans = [step for step in plan if step.startswith("SCAN ") and " COVERING INDEX " not in step]
+            temp_btrees = [step for step in plan if step.startswith("USE TEMP B-TREE")]
+            report.append({"name": name, "query": query, "plan": plan, "full_scans": full_scans,
+                           "temp_btrees": temp_btrees})
+            status = f"full scan: {', '.join(full_scans)}" if full_scans else "indexed"
+            print(f"[index advisor] {name}: {status}" + (f" ({', '.join(temp_btrees)})" if temp_btrees else ""))
+        return report
+
     def table_info(self, table_name: str) -> List[Tuple]:
         """
         Get information about the columns in a table.
@@ -110,6 +362,73 @@ class SQLiteDBAdmin:
         return info
 
 
+def _schema_indexes(table_name: str, table_indexes: Dict) -> List[Dict]:
+    """Return the index definitions for a table such as "sales_sdf" from a config keyed by schema name ("Sales")."""
+    schema_name = table_name[:-4] if table_name.endswith("_sdf") else table_name
+    for name, indexes in table_indexes.items():
+        if name.lower() == schema_name.lower():
+            return indexes
+    return []
+
+
+def index_statements(table_name: str, table_indexes: Dict, existing_columns: List[str] = None) -> List[str]:
+    """
+    Build the CREATE INDEX statements configured for a table.
+
+    :param table_name: The name of the table (e.g. "sales_sdf" or "Sales").
+    :param table_indexes: The "tables" entry of the indexes config: schema name to list of
+                          {"columns": [...], "unique": bool} definitions.
+    :param existing_columns: Columns the table actually has; indexes on missing columns are skipped.
+    :return: A list of CREATE INDEX IF NOT EXISTS statements.
+    """
+    statements = []
+    for index in _schema_indexes(table_name, table_indexes):
+        columns = index["columns"]
+        if existing_columns is not None and not set(columns) <= set(existing_columns):
+            continue
+        index_name = f"idx_{table_name}_{'_'.join(columns)}".lower()
+        unique = "UNIQUE " if index.get("unique", False) else ""
+        quoted_columns = ", ".join(f'"{column}"' for column in columns)
+        statements.append(f'CREATE {unique}INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ({quoted_columns})')
+    return statements
+
+
+def create_indexes(db_path: str, table_indexes: Dict, analysis_limit: int = None) -> Dict:
+    """
+    Create the configured secondary indexes on every table in the database, then run ANALYZE.
+
+    Meant to run once after the bulk load, so rows are inserted without index maintenance and
+    each index is built in a single sorted pass. ANALYZE refreshes the statistics the query
+    planner uses to choose between the new indexes.
+
+    :param db_path: Path to the SQLite database.
+    :param table_indexes: Schema name to list of index definitions (see index_statements).
+    :param analysis_limit: Optional PRAGMA analysis_limit so ANALYZE samples large indexes.
+    :return: A dictionary with the number of indexes created per table and the elapsed seconds.
+    """
+    start_time = time.perf_counter()
+    manager = get_connection_manager(db_path)
+    created = {}
+    with manager.transaction() as conn:
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                                 "AND name NOT LIKE 'sqlite_%'")]
+        for table_name in tables:
+            columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")')]
+            statements = index_statements(table_name, table_indexes, columns)
+            for index_sql in statements:
+                conn.execute(index_sql)
+            if statements:
+                created[table_name] = len(statements)
+
+    conn = manager.connection()
+    if analysis_limit:
+        conn.execute(f"PRAGMA analysis_limit = {int(analysis_limit)}")
+    conn.execute("ANALYZE")
+    report = {"indexes": created, "seconds": round(time.perf_counter() - start_time, 3)}
+    print(f"Created indexes {created} and analyzed {db_path} in {report['seconds']}s.")
+    return report
+
+
 def create_tables(config):
     db_admin = SQLiteDBAdmin(config['database']['path'])
     db_admin.connect()
@@ -126,13 +445,118 @@ def create_tables(config):
     print("All tables created successfully.")
 
 
-def get_next_version_number(model_name, db_path):
-    print(f"Fetching next version number for model: {model_name}")
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT MAX(Version) FROM model_info WHERE Model_Name = ?", (model_name,))
-    result = cursor.fetchone()
-    next_version = (result[0] if result[0] is not None else 0) + 1
-    conn.close()
-    return next_version
+DEFAULT_LOAD_PRAGMAS = {
+    "journal_mode": "MEMORY",
+    "synchronous": "OFF",
+    "cache_size": -262144,
+    "temp_store": "MEMORY"
+}
+
+
+def _sqlite_column_type(dtype) -> str:
+    """Map a pandas dtype to the SQLite column type used when the loader creates a table."""
+    if dtype.kind in "iub":
+        return "INTEGER"
+    if dtype.kind == "f":
+        return "REAL"
+    return "TEXT"
+
+
+def _column_values(series) -> list:
+    """Convert a pandas column to a list of Python values sqlite3 can bind, with NULLs as None."""
+    if series.dtype.kind in "iufb":
+        # tolist() yields native ints/floats; SQLite stores NaN as NULL
+        return series.to_numpy().tolist()
+    if series.dtype.kind == "M":
+        series = format_stored_dates(series)
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def format_stored_dates(series):
+    """
+    Format a datetime column as the ISO text every writer stores dates as (the TEXT Date columns
+    of data_table_schemas): "YYYY-MM-DD" for whole days, "YYYY-MM-DD HH:MM:SS" otherwise.
+
+    :param series: pandas Series of datetime64 values.
+    :return: pandas Series of strings, NaN where the date is missing.
+    """
+    timestamps = series.dt
+    date_only = ((timestamps.hour == 0) & (timestamps.minute == 0) & (timestamps.second == 0)).all()
+    return timestamps.strftime("%Y-%m-%d" if date_only else "%Y-%m-%d %H:%M:%S")
+
+
+@traced("sqlite.bulk_insert", rows=lambda report: report["rows"])
+def bulk_insert_dataframe_to_sqlite(df, table_name: str, db_path: str, batch_size: int = 50000,
+                                    pragmas: Dict = None, indexes: List[str] = None) -> Dict:
+    """
+    Insert a pandas DataFrame into SQLite directly, without Spark or the JVM.
+
+    All rows go in a single transaction through batched executemany calls while the load PRAGMAs
+    are in effect. Secondary indexes already on the table are dropped before the load and
+    recreated, together with any extra indexes given, once the rows are in. A failed load is
+    rolled back, which needs a rollback journal: journal_mode OFF is rejected. Datetime columns
+    are stored as ISO text (see format_stored_dates).
+
+    :param df: The pandas DataFrame to insert.
+    :param table_name: The name of the table to insert data into (created if it does not exist).
+    :param db_path: Path to the SQLite database.
+    :param batch_size: Number of rows passed to each executemany call.
+    :param pragmas: PRAGMA settings applied for the duration of the load (defaults to DEFAULT_LOAD_PRAGMAS);
+                    journal_mode must not be OFF.
+    :param indexes: Optional CREATE INDEX statements to run after the insert.
+    :return: A dictionary with the table name, row count, elapsed seconds and rows/sec.
+    """
+    pragmas = DEFAULT_LOAD_PRAGMAS if pragmas is None else pragmas
+    if str(pragmas.get("journal_mode", "")).upper() == "OFF":
+        # Without a rollback journal ROLLBACK is undefined, so a failed load could not be undone
+        raise ValueError("journal_mode = OFF cannot roll back a failed load; use MEMORY or WAL")
+    print(f"Bulk inserting data into {table_name} table...")
+    start_time = time.perf_counter()
+    columns = list(df.columns)
+    quoted_columns = [f'"{column}"' for column in columns]
+    column_defs = [f'{quoted} {_sqlite_column_type(df[column].dtype)}'
+                   for quoted, column in zip(quoted_columns, columns)]
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        previous_journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        for name, value in pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+
+        conn.execute("BEGIN")
+        conn.execute(f'CREATE TABLE IF NOT EXISTS "{table_name}" ({", ".join(column_defs)})')
+        existing_indexes = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (table_name,)).fetchall()
+        for index_name, _ in existing_indexes:
+            conn.execute(f'DROP INDEX "{index_name}"')
+
+        insert_sql = (f'INSERT INTO "{table_name}" ({", ".join(quoted_columns)}) '
+                      f'VALUES ({", ".join("?" for _ in columns)})')
+        for offset in range(0, len(df), batch_size):
+            batch = df.iloc[offset:offset + batch_size]
+            conn.executemany(insert_sql, zip(*(_column_values(batch[column]) for column in columns)))
+
+        for _, index_sql in existing_indexes:
+            conn.execute(index_sql)
+        for index_sql in indexes or []:
+            conn.execute(index_sql)
+        conn.execute("COMMIT")
+        conn.execute(f"PRAGMA journal_mode = {previous_journal_mode}")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
 
+    elapsed = time.perf_counter() - start_time
+    report = {
+        "table": table_name,
+        "rows": len(df),
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(len(df) / elapsed, 1) if elapsed > 0 else float("inf")
+    }
+    print(f"Finished inserting {report['rows']} rows into {table_name} table "
+          f"in {report['seconds']}s ({report['rows_per_sec']} rows/sec).")
+    return report
@@ -0,0 +1,373 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from pyspark import StorageLevel
+from pyspark.ml.clustering import KMeans, BisectingKMeans, GaussianMixture
+from pyspark.ml.evaluation import ClusteringEvaluator
+from pyspark.ml.feature import VectorAssembler, StandardScaler
+from pyspark.sql.functions import current_timestamp
+from src.data.compact import readable_table
+from src.data.database_operations import SQLiteDBAdmin, bulk_insert_dataframe_to_sqlite, get_connection_manager
+from src.models.customer_segmentation.features import (
+    calculate_rfm_with_time, loyalty_program_engagement_segmentation, customer_lifecycle_segmentation,
+    product_affinity_segmentation, store_loyalty_segmentation, feedback_sentiment_segmentation
+)
+from src.models.customer_segmentation.feature_store import update_customer_features, load_customer_features
+from src.utils.instrumentation import configure_instrumentation, span, traced
+from src.utils.snapshot_cache import read_table_cached
+from src.utils.spark_utils import get_config, get_spark, read_dataframe_from_sqlite, save_spark_model, pandas_to_spark
+
+MODEL_TYPES = {
+    "KMeans": KMeans,
+    "BisectingKMeans": BisectingKMeans,
+    "GaussianMixture": GaussianMixture
+}
+K_VALUES = [2, 3, 4, 5, 6, 7, 8, 9, 10]
+
+# z-value for the 95% confidence intervals reported by the sampled evaluators
+Z_95 = 1.96
+
+
+def _stratified_sample(predictions, sample_size, min_per_cluster, seed, features_col, prediction_col):
+    """
+    Draw a sample stratified by cluster and collect it to the driver.
+
+    Every cluster gets at least min_per_cluster rows (or all of its rows), so small clusters are
+    represented; each row carries the inverse of its cluster's sampling fraction as a weight.
+    """
+    cluster_counts = {row[prediction_col]: row["count"]
+                      for row in predictions.groupBy(prediction_col).count().collect()}
+    total = sum(cluster_counts.values())
+    base_fraction = min(1.0, sample_size / total)
+    fractions = {cluster: min(1.0, max(base_fraction, min_per_cluster / count))
+                 for cluster, count in cluster_counts.items()}
+    rows = predictions.select(features_col, prediction_col).sampleBy(prediction_col, fractions, seed).collect()
+    features = np.array([row[features_col].toArray() for row in rows])
+    labels = np.array([row[prediction_col] for row in rows])
+    weights = np.array([1.0 / fractions[label] for label in labels])
+    return features, labels, weights
+
+
+def _weighted_mean_with_error(values, weights):
+    """Weighted mean of per-point scores with its standard error."""
+    mean = np.average(values, weights=weights)
+    std_error = np.sqrt(np.sum((weights * (values - mean)) ** 2)) / np.sum(weights)
+    return float(mean), float(std_error)
+
+
+def _silhouette_values(features, labels, chunk_size=1000):
+    """Per-point silhouette within the sample, using squared Euclidean distance like ClusteringEvaluator."""
+    clusters, label_idx = np.unique(labels, return_inverse=True)
+    one_hot = np.zeros((len(labels), len(clusters)))
+    one_hot[np.arange(len(labels)), label_idx] = 1.0
+    cluster_sizes = one_hot.sum(axis=0)
+    squared_norms = np.einsum("ij,ij->i", features, features)
+
+    values = np.zeros(len(labels))
+    for start in range(0, len(labels), chunk_size):
+        stop = start + chunk_size
+        distances = np.maximum(
+            squared_norms[start:stop, None] + squared_norms[None, :] - 2 * features[start:stop] @ features.T, 0.0)
+        mean_distances = (distances @ one_hot) / np.maximum(cluster_sizes, 1)
+        own = label_idx[start:stop]
+        rows = np.arange(len(own))
+        own_sizes = cluster_sizes[own]
+        # Exclude the point itself (distance 0) from its own cluster's mean
+        a = mean_distances[rows, own] * own_sizes / np.maximum(own_sizes - 1, 1)
+        mean_distances[rows, own] = np.inf
+        b = mean_distances.min(axis=1)
+        chunk_values = (b - a) / np.maximum(np.maximum(a, b), 1e-12)
+        values[start:stop] = np.where(own_sizes > 1, chunk_values, 0.0)
+    return values
+
+
+def _centroid_silhouette_values(features, labels):
+    """Per-point simplified silhouette: distance to the own centroid against the nearest other centroid."""
+    clusters, label_idx = np.unique(labels, return_inverse=True)
+    centroids = np.array([features[label_idx == i].mean(axis=0) for i in range(len(clusters))])
+    distances = ((features[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+    rows = np.arange(len(labels))
+    a = distances[rows, label_idx]
+    distances[rows, label_idx] = np.inf
+    b = distances.min(axis=1)
+    return (b - a) / np.maximum(np.maximum(a, b), 1e-12)
+
+
+def _centroid_gap(features, labels, weights, centroid_values, validation_size, seed):
+    """
+    Difference between the simplified and the pairwise silhouette on a random subsample of the
+    sample, i.e. how far the centroid approximation is off for this clustering.
+    """
+    check = np.random.default_rng(seed).choice(len(labels), size=min(validation_size, len(labels)), replace=False)
+    if len(np.unique(labels[check])) < 2:
+        return 0.0
+    exact_values = _silhouette_values(features[check], labels[check])
+    return float(np.average(centroid_values[check] - exact_values, weights=weights[check]))
+
+
+@traced("clustering.evaluate_silhouette")
+def evaluate_silhouette(predictions, mode="exact", sample_size=5000, min_per_cluster=50, seed=42,
+                        features_col="scaled_features", prediction_col="prediction", validation_size=500):
+    """
+    Score a clustering by silhouette, exactly or from a stratified sample.
+
+    "exact" runs ClusteringEvaluator over every row. "sampled" computes the silhouette of each
+    sampled point against the sample. "centroid" uses the cheaper simplified silhouette (distance to
+    the point's cluster centroid against the nearest other centroid, centroids estimated from the
+    sample), which is O(n * k) instead of O(n^2) but is a different quantity from the silhouette:
+    its approximation_gap is measured against the pairwise silhouette on validation_size sampled
+    points and widens the confidence interval. Sampled scores come with a standard error (sampling
+    noise only) and a 95% confidence interval.
+
+    :param predictions: DataFrame with the feature vectors and cluster predictions.
+    :param mode: "exact", "sampled" or "centroid".
+    :param sample_size: Approximate number of rows to sample.
+    :param min_per_cluster: Minimum rows sampled from each cluster.
+    :param seed: Sampling seed.
+    :param features_col: Name of the feature vector column.
+    :param prediction_col: Name of the cluster prediction column.
+    :param validation_size: Points on which the centroid mode is checked against the pairwise silhouette.
+    :return: Dictionary with the score, std_error, approximation_gap, ci_low, ci_high, sample_size and mode.
+    """
+    if mode == "exact":
+        evaluator = ClusteringEvaluator(featuresCol=features_col, predictionCol=prediction_col,
+                                        metricName="silhouette")
+        score = evaluator.evaluate(predictions)
+        return {"score": score, "std_error": 0.0, "approximation_gap": 0.0, "ci_low": score, "ci_high": score,
+                "sample_size": None, "mode": mode}
+
+    features, labels, weights = _stratified_sample(predictions, sample_size, min_per_cluster, seed, features_col,
+                                                   prediction_col)
+    if len(np.unique(labels)) < 2:
+        return {"score": 0.0, "std_error": 0.0, "approximation_gap": 0.0, "ci_low": 0.0, "ci_high": 0.0,
+                "sample_size": len(labels), "mode": mode}
+    gap = 0.0
+    if mode == "sampled":
+        values = _silhouette_values(features, labels)
+    elif mode == "centroid":
+        values = _centroid_silhouette_values(features, labels)
+        gap = _centroid_gap(features, labels, weights, values, validation_size, seed)
+    else:
+        raise ValueError(f"Unknown silhouette evaluation mode: {mode}")
+    score, std_error = _weighted_mean_with_error(values, weights)
+    margin = Z_95 * std_error + abs(gap)
+    return {"score": score, "std_error": std_error, "approximation_gap": gap, "ci_low": score - margin,
+            "ci_high": score + margin, "sample_size": len(labels), "mode": mode}
+
+
+@traced("clustering.scale_features")
+def scale_features(data, feature_columns):
+    """
+    Assemble and standardize the feature columns, then cache and materialize the result.
+
+    Every candidate in a search reads this DataFrame, so it is computed once instead of once per fit.
+
+    :param data: Spark DataFrame with the feature columns.
+    :param feature_columns: Names of the numeric feature columns.
+    :return: Cached Spark DataFrame with a "scaled_features" vector column.
+    """
+    assembler = VectorAssembler(inputCols=feature_columns, outputCol="features")
+    data = assembler.transform(data.na.fill(0))
+    scaler = StandardScaler(inputCol="features", outputCol="scaled_features")
+    scaled = scaler.fit(data).transform(data).persist(StorageLevel.MEMORY_AND_DISK)
+    scaled.count()
+    return scaled
+
+
+def _fit_candidate(scaled_data, model_type, model_class, k, seed, segmentation_name, evaluation):
+    """Fit and score one (model_type, k) candidate; returns None if the fit fails."""
+    spark_context = scaled_data.sparkSession.sparkContext
+    spark_context.setJobDescription(f"{segmentation_name}: {model_type} k={k}")
+    logging.info(f"Training {model_type} with k={k} for {segmentation_name}")
+    try:
+        start_time = time.time()
+        with span(f"clustering.fit.{model_type}"):
+            trained_model = model_class(k=k, featuresCol="scaled_features", seed=seed).fit(scaled_data)
+        training_time = time.time() - start_time
+        predictions = trained_model.transform(scaled_data)
+        score = evaluate_silhouette(predictions, seed=seed, **evaluation)
+    except Exception as e:
+        logging.error(f"Failed to fit or transform model {model_type} for {segmentation_name} with k={k}: {str(e)}")
+        return None
+    logging.info(f"{segmentation_name} {model_type} k={k}: silhouette={score['score']:.4f} "
+                 f"+/- {(score['ci_high'] - score['ci_low']) / 2:.4f} ({score['mode']})")
+    return {"model_type": model_type, "k": k, "model": trained_model, "silhouette": score["score"],
+            "silhouette_std_error": score["std_error"], "evaluation": score["mode"], "training_time": training_time}
+
+
+def _promote_to_exact(results, scaled_data, promote_top, seed):
+    """Rescore the best promote_top approximate candidates exactly and rank them first by exact score."""
+    promoted, rest = results[:promote_top], results[promote_top:]
+    for result in promoted:
+        if result["evaluation"] != "exact":
+            score = evaluate_silhouette(result["model"].transform(scaled_data), mode="exact", seed=seed)
+            result.update(silhouette=score["score"], silhouette_std_error=0.0, evaluation="exact")
+    return sorted(promoted, key=lambda r: r["silhouette"], reverse=True) + rest
+
+
+def search_clusterings(scaled_data, k_values, model_types, segmentation_name, max_workers=4, seed=42,
+                       evaluation=None, promote_top=3):
+    """
+    Fit every (k, model_type) candidate concurrently against the shared SparkSession.
+
+    Each candidate is submitted from its own driver thread, so Spark schedules their jobs side by
+    side instead of one after another. Candidates are scored with evaluate_silhouette; when that is
+    approximate, the best promote_top candidates are rescored exactly before the final ranking.
+
+    :param scaled_data: Cached DataFrame from scale_features.
+    :param k_values: Cluster counts to try.
+    :param model_types: Dictionary of model name to Spark clustering estimator class.
+    :param segmentation_name: Name used in logs and job descriptions.
+    :param max_workers: Number of candidates fitted at the same time.
+    :param seed: Seed passed to every estimator.
+    :param evaluation: Keyword arguments for evaluate_silhouette (e.g. {"mode": "sampled", "sample_size": 5000}).
+    :param promote_top: Number of top approximate candidates rescored exactly.
+    :return: List of candidate result dictionaries, best first.
+    """
+    evaluation = evaluation or {"mode": "exact"}
+    candidates = [(model_type, model_class, k) for k in k_values for model_type, model_class in model_types.items()]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_fit_candidate, scaled_data, model_type, model_class, k, seed, segmentation_name,
+                                   evaluation)
+                   for model_type, model_class, k in candidates]
+        results = [future.result() for future in futures]
+    results = sorted((result for result in results if result is not None), key=lambda r: r["silhouette"],
+                     reverse=True)
+    return _promote_to_exact(results, scaled_data, promote_top, seed)
+
+
+def preprocess_and_cluster(data, feature_columns, k_values, model_types, segmentation_name, db_path, max_workers=4,
+                           seed=42, evaluation=None, promote_top=3):
+    """
+    Scale the features, search all clustering candidates and persist only the winner.
+
+    :param data: Spark DataFrame with the feature columns.
+    :param feature_columns: Names of the numeric feature columns.
+    :param k_values: Cluster counts to try.
+    :param model_types: Dictionary of model name to Spark clustering estimator class.
+    :param segmentation_name: Name of the segmentation, used for the saved model name.
+    :param db_path: Path to the SQLite database holding model_info.
+    :param max_workers: Number of candidates fitted at the same time.
+    :param seed: Seed passed to every estimator.
+    :param evaluation: Keyword arguments for evaluate_silhouette used to score candidates.
+    :param promote_top: Number of top approximate candidates rescored exactly.
+    :return: Predictions of the best model with "cluster" and "Timestamp" columns, or None.
+    """
+    logging.info(f"Starting preprocessing and clustering for {segmentation_name}")
+    if data.limit(1).count() == 0:
+        logging.warning(f"No data available for segmentation: {segmentation_name}")
+        return None
+    # Rows without any feature would otherwise be filled with zeros and clustered as a fake segment
+    data = data.na.drop(how="all", subset=feature_columns)
+    if data.limit(1).count() == 0:
+        logging.warning(f"All feature data are null for {segmentation_name}")
+        return None
+
+    scaled_data = scale_features(data, feature_columns)
+    results = search_clusterings(scaled_data, k_values, model_types, segmentation_name, max_workers, seed, evaluation,
+                                 promote_top)
+    if not results:
+        return None
+
+    best = results[0]
+    model_name = f"{segmentation_name}-{best['model_type']}-k{best['k']}"
+    save_spark_model(best["model"], model_name, db_path,
+                     metrics={"silhouette": best["silhouette"], "training_time": best["training_time"], "k": best["k"]},
+                     Silhouette_Score=best["silhouette"], Training_Time=best["training_time"], K_Value=best["k"])
+    logging.info(f"Best model for {segmentation_name}: {model_name} (silhouette={best['silhouette']:.4f})")
+
+    predictions = best["model"].transform(scaled_data).withColumnRenamed("prediction", "cluster")
+    return predictions.withColumn("Timestamp", current_timestamp())
+
+
+def _read_table(spark, table_name, db_path, config):
+    """
+    Read a table into Spark, through its <table>_wide view when it is stored in the compact layout.
+
+    With snapshot.enabled, stored tables are served from their Parquet snapshot, which is only
+    rebuilt over JDBC when the table changed.
+    """
+    source = readable_table(get_connection_manager(db_path).connection(), table_name)
+    snapshot_config = config.get("snapshot", {})
+    if source == table_name and snapshot_config.get("enabled", False):
+        return read_table_cached(spark, table_name, db_path, "org.sqlite.JDBC", snapshot_config["path"],
+                                 config.get("data_table_schemas"))
+    # Views have no rowid to split the read on
+    return read_dataframe_from_sqlite(spark, source, db_path, "org.sqlite.JDBC",
+                                      partition_column="rowid" if source == table_name else None)
+
+
+def main():
+    config = get_config()
+    configure_instrumentation(config)
+    db_path = config["database"]["path"]
+    segmentation_config = config.get("segmentation", {})
+    k_values = segmentation_config.get("k_values", K_VALUES)
+    max_workers = segmentation_config.get("max_workers", 4)
+    evaluation = segmentation_config.get("evaluation", {"mode": "exact"})
+    promote_top = segmentation_config.get("promote_top", 3)
+    seed = config["ml_model"]["random_state"]
+
+    # Ensure the model_info table exists
+    db_admin = SQLiteDBAdmin(db_path)
+    db_admin.connect()
+    db_admin.create_table("model_info", config["model_table_schemas"]["model_info"])
+    db_admin.close()
+
+    spark = get_spark()
+    sales_df, product_df, store_df, loyalty_df, feedback_df = (
+        _read_table(spark, table_name, db_path, config)
+        for table_name in ["sales_sdf", "product_sdf", "store_sdf", "loyalty_sdf", "feedback_sdf"])
+
+    if segmentation_config.get("use_feature_store", False):
+        # Fold only the sales added since the last run into the persisted customer features
+        update_customer_features(db_path)
+        rfm_df, _ = pandas_to_spark(spark, load_customer_features(db_path), "customer_features", {})
+    else:
+        rfm_df = calculate_rfm_with_time(sales_df)
+
+    segmentations = {
+        "RFM_with_Time": {
+            "data_func": lambda: rfm_df,
+            "features": ["Recency", "Frequency", "Monetary", "Customer_Age"]
+        },
+        "Loyalty_Program_Engagement": {
+            "data_func": lambda: loyalty_program_engagement_segmentation(loyalty_df),
+            "features": ["Total_Points_Earned", "Total_Points_Redeemed", "Membership_Tier_Index"]
+        },
+        "Customer_Lifecycle": {
+            "data_func": lambda: customer_lifecycle_segmentation(rfm_df),
+            "features": ["Recency", "Lifecycle_Segment_Index"]
+        },
+        "Product_Affinity": {
+            "data_func": lambda: product_affinity_segmentation(sales_df, product_df),
+            "features": ["Category_Purchase_Count", "Category_Spending"]
+        },
+        "Store_Loyalty": {
+            "data_func": lambda: store_loyalty_segmentation(sales_df, store_df),
+            "features": ["Store_Visit_Frequency", "Store_Total_Spending"]
+        },
+        "Feedback_Sentiment": {
+            "data_func": lambda: feedback_sentiment_segmentation(feedback_df),
+            "features": ["Avg_Sentiment_Score"]
+        }
+    }
+
+    for seg_name, seg_info in segmentations.items():
+        logging.info(f"Processing segmentation: {seg_name}")
+        with span(f"segmentation.{seg_name}") as seg_span:
+            predictions = preprocess_and_cluster(seg_info["data_func"](), seg_info["features"], k_values,
+                                                 MODEL_TYPES, seg_name, db_path, max_workers, seed, evaluation,
+                                                 promote_top)
+            if predictions is not None:
+                predictions_pandas = predictions.select("Customer_ID", "cluster", "Timestamp").toPandas()
+                seg_span.rows = len(predictions_pandas)
+                bulk_insert_dataframe_to_sqlite(predictions_pandas, f"{seg_name}_results", db_path, pragmas={})
+        # Release the cached feature DataFrame before the next segmentation
+        spark.catalog.clearCache()
+    spark.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import hashlib
+from datetime import datetime
+import pandas as pd
+from src.data.compact import readable_table, wide_select
+from src.data.database_operations import get_connection_manager
+from src.utils.instrumentation import traced
+
+FEATURE_TABLE = "customer_features"
+CATEGORY_TABLE = "customer_categories"
+WATERMARK_TABLE = "feature_watermarks"
+
+FEATURE_TABLE_SCHEMAS = {
+    FEATURE_TABLE: [
+        "Customer_ID TEXT PRIMARY KEY",
+        "First_Purchase_Date",
+        "Last_Purchase_Date",
+        "Frequency INTEGER",
+        "Monetary REAL",
+        "Category_Variety INTEGER",
+        "Points_Earned REAL",
+        "Points_Redeemed REAL",
+        "Membership_Tier TEXT",
+        "Updated_At TEXT"
+    ],
+    CATEGORY_TABLE: [
+        "Customer_ID TEXT",
+        "Category TEXT",
+        "PRIMARY KEY (Customer_ID, Category)"
+    ],
+    WATERMARK_TABLE: [
+        "Source_Table TEXT PRIMARY KEY",
+        "Max_Rowid INTEGER",
+        "Fingerprint TEXT",
+        "Updated_At TEXT"
+    ]
+}
+
+
+def _create_feature_tables(conn):
+    for table_name, columns in FEATURE_TABLE_SCHEMAS.items():
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(columns)})")
+    # Watermark tables written before fingerprints were kept; their watermarks force one full rebuild
+    if "Fingerprint" not in {row[1] for row in conn.execute(f"PRAGMA table_info({WATERMARK_TABLE})")}:
+        conn.execute(f"ALTER TABLE {WATERMARK_TABLE} ADD COLUMN Fingerprint TEXT")
+
+
+def _get_watermark(conn, source_table):
+    row = conn.execute(f"SELECT Max_Rowid, Fingerprint FROM {WATERMARK_TABLE} WHERE Source_Table = ?",
+                       (source_table,)).fetchone()
+    return tuple(row) if row else (0, None)
+
+
+def _set_watermark(conn, source_table, max_rowid, updated_at):
+    conn.execute(f"INSERT INTO {WATERMARK_TABLE} (Source_Table, Max_Rowid, Fingerprint, Updated_At) "
+                 f"VALUES (?, ?, ?, ?) ON CONFLICT(Source_Table) DO UPDATE SET Max_Rowid = excluded.Max_Rowid, "
+                 f"Fingerprint = excluded.Fingerprint, Updated_At = excluded.Updated_At",
+                 (source_table, max_rowid, _row_fingerprint(conn, source_table, max_rowid), updated_at))
+
+
+def _row_fingerprint(conn, source_table, rowid):
+    """Hash of the row stored at rowid, or None if there is no such row."""
+    row = conn.execute(f"SELECT * FROM {source_table} WHERE rowid = ?", (rowid,)).fetchone()
+    return None if row is None else hashlib.sha1(repr(tuple(row)).encode()).hexdigest()
+
+
+def _customer_column(conn, table_name):
+    """The customer column of a stored table: Customer_Key in the compact layout, else Customer_ID."""
+    columns = {row[1] for row in conn.execute(f'PRAGMA table_info("{table_name}")')}
+    return "Customer_Key" if "Customer_Key" in columns else "Customer_ID"
+
+
+def _only_appended(conn, source_table, max_rowid):
+    """
+    Whether the rows folded in up to the watermark are still in place, i.e. the table was only
+    appended to since. A table rebuilt by a loader restarts its rowids, which leaves it shorter
+    than the watermark or with a different row at the watermark.
+    """
+    watermark, fingerprint = _get_watermark(conn, source_table)
+    if watermark == 0:
+        return True
+    return max_rowid >= watermark and _row_fingerprint(conn, source_table, watermark) == fingerprint
+
+
+@traced("features.update_customer_features", rows=lambda result: result["new_sales_rows"])
+def update_customer_features(db_path, sales_table="sales_sdf", product_table="product_sdf",
+                             loyalty_table="loyalty_sdf"):
+    """
+    Bring the persisted customer feature table up to date with the sales added since the last run.
+
+    Sales are append-only, so the stored watermark is the highest sales rowid already folded in and
+    each run aggregates only the rows above it: purchase dates are merged with MIN/MAX, frequency,
+    monetary and points earned are added, and newly seen (customer, category) pairs update the
+    category variety of the affected customers. If the sales table was rebuilt instead (detected
+    from the watermark row's fingerprint), the features are rebuilt from all of it. Loyalty
+    redemptions and tiers are aggregated once, from the stored loyalty table, for the customers with
+    new loyalty rows or new sales, or for everyone when the loyalty table was rebuilt. Everything, including the watermarks, commits
+    in one transaction. Tables stored in the compact layout (src.data.compact) are read with their
+    IDs and labels rebuilt.
+
+    :param db_path: Path to the SQLite database.
+    :param sales_table: Name of the sales table.
+    :param product_table: Name of the product table (for categories).
+    :param loyalty_table: Name of the loyalty table.
+    :return: Dictionary with the number of new sales rows, customers updated and whether the
+             features were rebuilt.
+    """
+    manager = get_connection_manager(db_path, wal=True)
+    updated_at = datetime.now().isoformat(sep=" ")
+    with manager.transaction() as conn:
+        _create_feature_tables(conn)
+        max_sales_rowid = conn.execute(f"SELECT MAX(rowid) FROM {sales_table}").fetchone()[0] or 0
+        rebuild = not _only_appended(conn, sales_table, max_sales_rowid)
+        if rebuild:
+            print(f"{sales_table} was rebuilt since the last update; rebuilding the customer features.")
+            conn.execute(f"DELETE FROM {FEATURE_TABLE}")
+            conn.execute(f"DELETE FROM {CATEGORY_TABLE}")
+            sales_watermark = 0
+        else:
+            sales_watermark = _get_watermark(conn, sales_table)[0]
+        new_rows = conn.execute(f"SELECT COUNT(*) FROM {sales_table} WHERE rowid > ? AND rowid <= ?",
+                                (sales_watermark, max_sales_rowid)).fetchone()[0]
+
+        # Compact databases are read with their IDs rebuilt; the watermark stays on the stored rowids
+        sales_source = wide_select(conn, sales_table) or f"SELECT * FROM {sales_table} AS t"
+        new_sales = f"{sales_source} WHERE t.rowid > {int(sales_watermark)} AND t.rowid <= {int(max_sales_rowid)}"
+        product_source = readable_table(conn, product_table)
+        conn.execute(f"""
+            INSERT INTO {FEATURE_TABLE} (Customer_ID, First_Purchase_Date, Last_Purchase_Date, Frequency, Monetary,
+                                         Category_Variety, Points_Earned, Points_Redeemed, Updated_At)
+            SELECT Customer_ID, MIN(Date), MAX(Date), COUNT(DISTINCT Transaction_ID), SUM(Sales_Amount),
+                   0, SUM(Sales_Amount), 0, ?
+            FROM ({new_sales}) WHERE TRUE GROUP BY Customer_ID
+            ON CONFLICT(Customer_ID) DO UPDATE SET
+                First_Purchase_Date = MIN(First_Purchase_Date, excluded.First_Purchase_Date),
+                Last_Purchase_Date = MAX(Last_Purchase_Date, excluded.Last_Purchase_Date),
+                Frequency = Frequency + excluded.Frequency,
+                Monetary = Monetary + excluded.Monetary,
+                Points_Earned = Points_Earned + excluded.Points_Earned,
+                Updated_At = excluded.Updated_At
+        """, (updated_at,))
+
+        conn.execute(f"""
+            INSERT OR IGNORE INTO {CATEGORY_TABLE} (Customer_ID, Category)
+            SELECT DISTINCT s.Customer_ID, p.Category
+            FROM ({new_sales}) AS s JOIN {product_source} AS p ON p.Product_ID = s.Product_ID
+        """)
+        customers_updated = conn.execute(f"""
+            UPDATE {FEATURE_TABLE}
+            SET Category_Variety = (SELECT COUNT(*) FROM {CATEGORY_TABLE} AS c
+                                    WHERE c.Customer_ID = {FEATURE_TABLE}.Customer_ID)
+            WHERE Customer_ID IN (SELECT DISTINCT Customer_ID FROM ({new_sales}))
+        """).rowcount
+        _set_watermark(conn, sales_table, max_sales_rowid, updated_at)
+
+        # Loyalty is aggregated once per changed customer on the stored table (served by its customer
+        # index) and only the aggregates are decoded, instead of a lookup through the wide view per row
+        max_loyalty_rowid = conn.execute(f"SELECT MAX(rowid) FROM {loyalty_table}").fetchone()[0] or 0
+        loyalty_customer = _customer_column(conn, loyalty_table)
+        if rebuild or not _only_appended(conn, loyalty_table, max_loyalty_rowid):
+            conn.execute(f"UPDATE {FEATURE_TABLE} SET Points_Redeemed = 0, Membership_Tier = NULL")
+            changed = ""
+        else:
+            loyalty_watermark = _get_watermark(conn, loyalty_table)[0]
+            changed = (f"WHERE t.{loyalty_customer} IN ("
+                       f"SELECT {loyalty_customer} FROM {loyalty_table} WHERE rowid > {int(loyalty_watermark)} "
+                       f"UNION SELECT {_customer_column(conn, sales_table)} FROM {sales_table} "
+                       f"WHERE rowid > {int(sales_watermark)} AND rowid <= {int(max_sales_rowid)})")
+        loyalty_totals = (f"SELECT t.{loyalty_customer} AS {loyalty_customer}, "
+                          f"SUM(t.Points_Redeemed) AS Points_Redeemed, MAX(t.Membership_Tier) AS Membership_Tier "
+                          f"FROM {loyalty_table} AS t {changed} GROUP BY t.{loyalty_customer}")
+        loyalty_totals = wide_select(conn, loyalty_table, loyalty_totals) or loyalty_totals
+        conn.execute(f"""
+            UPDATE {FEATURE_TABLE}
+            SET Points_Redeemed = COALESCE(l.Points_Redeemed, 0), Membership_Tier = l.Membership_Tier
+            FROM ({loyalty_totals}) AS l
+            WHERE l.Customer_ID = {FEATURE_TABLE}.Customer_ID
+        """)
+        _set_watermark(conn, loyalty_table, max_loyalty_rowid, updated_at)
+
+    print(f"Customer features updated from {new_rows} new sales rows ({customers_updated} customers).")
+    return {"new_sales_rows": new_rows, "customers_updated": customers_updated, "rebuilt": rebuild}
+
+
+@traced("features.load_customer_features", rows=len)
+def load_customer_features(db_path, as_of=None):
+    """
+    Load the customer feature table with Recency and Customer_Age in days.
+
+    Ages are measured against as_of, which defaults to the latest purchase date in the store rather
+    than today's date, so results do not drift between runs on the same data.
+
+    :param db_path: Path to the SQLite database.
+    :param as_of: Reference date for Recency/Customer_Age (defaults to the latest Last_Purchase_Date).
+    :return: pandas DataFrame with one row per customer.
+    """
+    conn = get_connection_manager(db_path).connection()
+    features_df = pd.read_sql_query(f"SELECT * FROM {FEATURE_TABLE}", conn)
+    features_df["First_Purchase_Date"] = pd.to_datetime(features_df["First_Purchase_Date"], format="ISO8601")
+    features_df["Last_Purchase_Date"] = pd.to_datetime(features_df["Last_Purchase_Date"], format="ISO8601")
+    as_of = pd.Timestamp(as_of) if as_of is not None else features_df["Last_Purchase_Date"].max()
+    features_df["Recency"] = (as_of - features_df["Last_Purchase_Date"]).dt.days
+    features_df["Customer_Age"] = (as_of - features_df["First_Purchase_Date"]).dt.days
+    return features_df
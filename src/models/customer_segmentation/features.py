@@ -0,0 +1,66 @@
+from pyspark.ml.feature import StringIndexer
+from pyspark.sql.functions import col, when, to_date, datediff, current_date, countDistinct, first, avg, max, min, sum
+from pyspark.sql.types import DoubleType
+
+
+def calculate_rfm_with_time(sales_df):
+    # Ensure Date is properly formatted and retained before aggregation
+    sales_df = sales_df.withColumn("Date", to_date(col("Date"), "yyyy-MM-dd"))
+
+    # Calculate maximum purchase date, frequency, and monetary while retaining Date for further operations
+    rfm_df = sales_df.groupBy("Customer_ID").agg(
+        max("Date").alias("Last_Purchase_Date"),
+        min("Date").alias("First_Purchase_Date"),
+        countDistinct("Transaction_ID").alias("Frequency"),
+        sum("Sales_Amount").alias("Monetary")
+    )
+
+    # Calculate Recency and Customer Age
+    rfm_df = rfm_df.withColumn("Recency", datediff(current_date(), col("Last_Purchase_Date")))
+    rfm_df = rfm_df.withColumn("Customer_Age", datediff(current_date(), col("First_Purchase_Date")))
+
+    return rfm_df
+
+
+def loyalty_program_engagement_segmentation(loyalty_df):
+    indexer = StringIndexer(inputCol="Membership_Tier", outputCol="Membership_Tier_Index")
+    loyalty_df = loyalty_df.withColumn("Points_Redeemed", col("Points_Redeemed").cast(DoubleType()))
+    loyalty_df = loyalty_df.groupBy("Customer_ID").agg(
+        sum("Points_Earned").alias("Total_Points_Earned"),
+        sum("Points_Redeemed").alias("Total_Points_Redeemed"),
+        first("Membership_Tier").alias("Membership_Tier")
+    )
+    return indexer.fit(loyalty_df).transform(loyalty_df)
+
+
+def customer_lifecycle_segmentation(rfm_df):
+    # Adding a lifecycle segment based on recency
+    lifecycle_df = rfm_df.withColumn(
+        "Lifecycle_Segment",
+        when(col("Recency") <= 30, "Active")
+        .when((col("Recency") > 30) & (col("Recency") <= 90), "Warm")
+        .otherwise("Inactive")
+    )
+    # Convert categorical column to numeric using StringIndexer
+    indexer = StringIndexer(inputCol="Lifecycle_Segment", outputCol="Lifecycle_Segment_Index")
+    return indexer.fit(lifecycle_df).transform(lifecycle_df)
+
+
+def product_affinity_segmentation(sales_df, product_df):
+    return sales_df.join(product_df, "Product_ID").groupBy("Customer_ID", "Category").agg(
+        countDistinct("Transaction_ID").alias("Category_Purchase_Count"),
+        sum("Sales_Amount").alias("Category_Spending")
+    )
+
+
+def store_loyalty_segmentation(sales_df, store_df):
+    return sales_df.join(store_df, "Store_ID").groupBy("Customer_ID", "Store_Type").agg(
+        countDistinct("Transaction_ID").alias("Store_Visit_Frequency"),
+        sum("Sales_Amount").alias("Store_Total_Spending")
+    )
+
+
+def feedback_sentiment_segmentation(feedback_df):
+    return feedback_df.groupBy("Customer_ID").agg(
+        avg("Feedback_Rating").alias("Avg_Sentiment_Score")
+    )
@@ -0,0 +1,195 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from src.data.compact import readable_table
+from src.data.database_operations import SQLiteDBAdmin
+from src.utils.instrumentation import configure_instrumentation, traced
+from src.utils.spark_utils import get_config
+
+INDEX_ARRAYS = ["product_ids", "store_ids", "category_names", "product_category", "elasticity", "elasticity_std",
+                "category_elasticity", "base_price", "unit_cost", "base_quantity"]
+
+
+class ElasticityIndex:
+    """
+    Compact, array-backed lookup of everything the price scorer needs per product and store.
+
+    Products and stores map to row/column numbers once at load time; every other field is a
+    float32 (or int16) array indexed by those numbers, so a lookup is two dict hits and a few
+    array reads, and the whole index serializes to a single .npz file.
+    """
+
+    def __init__(self, arrays):
+        for name in INDEX_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.product_rows = {product_id: row for row, product_id in enumerate(self.product_ids.tolist())}
+        self.store_columns = {store_id: column for column, store_id in enumerate(self.store_ids.tolist())}
+
+    def save(self, path):
+        """Write the index to a compressed .npz file."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(path, **{name: getattr(self, name) for name in INDEX_ARRAYS})
+
+    @classmethod
+    def load(cls, path):
+        """Load an index written by save."""
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls({name: arrays[name] for name in INDEX_ARRAYS})
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in INDEX_ARRAYS)
+
+
+@traced("pricing.load_inputs", rows=len)
+def load_pricing_inputs(db_path, sales_table="sales_sdf", batch_size=100000):
+    """
+    Aggregate quantity and revenue per product, store and day inside SQLite.
+
+    :param db_path: Path to the SQLite database.
+    :param sales_table: The sales table (read through its <table>_wide view when stored compact).
+    :param batch_size: Rows fetched per batch.
+    :return: pandas DataFrame with Product_ID, Store_ID, Date, Quantity and Revenue.
+    """
+    db_admin = SQLiteDBAdmin(db_path)
+    db_admin.connect()
+    query = (f"SELECT Product_ID, Store_ID, Date, SUM(Quantity_Sold) AS Quantity, SUM(Sales_Amount) AS Revenue "
+             f"FROM {readable_table(db_admin.conn, sales_table)} GROUP BY Product_ID, Store_ID, Date")
+    daily_df = pd.concat(db_admin.iter_query_batches(query, batch_size=batch_size), ignore_index=True)
+    db_admin.close()
+    return daily_df
+
+
+def _grouped_regression(group_idx, num_groups, x, y):
+    """
+    Least-squares slope of y on x within each group, using bincount sums (no Python loop over groups).
+
+    :return: Tuple of (slope, slope variance) arrays; groups without variation in x get an infinite variance.
+    """
+    count = np.bincount(group_idx, minlength=num_groups).astype(np.float64)
+    safe_count = np.maximum(count, 1)
+    x_mean = np.bincount(group_idx, x, num_groups) / safe_count
+    y_mean = np.bincount(group_idx, y, num_groups) / safe_count
+    dx = x - x_mean[group_idx]
+    dy = y - y_mean[group_idx]
+    sxx = np.bincount(group_idx, dx * dx, num_groups)
+    sxy = np.bincount(group_idx, dx * dy, num_groups)
+    syy = np.bincount(group_idx, dy * dy, num_groups)
+
+    identified = (sxx > 1e-12) & (count > 2)
+    slope = np.where(identified, sxy / np.where(identified, sxx, 1), 0.0)
+    residual_var = np.maximum(syy - slope * sxy, 0) / np.maximum(count - 2, 1)
+    slope_var = np.where(identified, residual_var / np.where(identified, sxx, 1), np.inf)
+    return slope, slope_var
+
+
+def _shrink(estimate, estimate_var, prior, prior_var):
+    """Precision-weighted combination of an estimate with its prior; estimates with infinite variance drop out."""
+    weight = np.where(np.isfinite(estimate_var), prior_var / (prior_var + estimate_var), 0.0)
+    weight = np.nan_to_num(weight)
+    return prior + weight * (np.where(np.isfinite(estimate), estimate, prior) - prior), (1 - weight) * prior_var
+
+
+@traced("pricing.estimate_elasticities")
+def build_elasticity_index(daily_df, product_df, prior_elasticity=-1.5, prior_std=0.5, product_std=0.3,
+                           window_days=90):
+    """
+    Estimate log-log price elasticities per product and category and pack them into an ElasticityIndex.
+
+    Per product, the slope of log quantity on log realized unit price (revenue / quantity) across
+    its store-days measures elasticity from the product's own price changes. Products whose price
+    barely changed carry little information, so estimates are pooled hierarchically:
+
+    - category: the precision-weighted mean of its products' slopes (each with product_std of
+      product-to-product spread added), shrunk toward prior_elasticity (prior_std);
+    - product: its own slope, shrunk toward the category estimate.
+
+    Price differences between products are not used: they reflect what is sold, not how demand
+    reacts to price. With the generated data (one fixed price per product) every estimate
+    therefore falls back to the prior. Elasticities are capped at 0 so demand never rises with price.
+
+    :param daily_df: DataFrame from load_pricing_inputs.
+    :param product_df: Product table with Product_ID, Category, Price and Cost.
+    :param prior_elasticity: Prior mean elasticity for every category.
+    :param prior_std: Prior standard deviation of category elasticities.
+    :param product_std: Standard deviation of product elasticities around their category.
+    :param window_days: Days at the end of the history used for the baseline daily quantity.
+    :return: ElasticityIndex.
+    """
+    daily_df = daily_df[daily_df["Quantity"] > 0]
+    product_df = product_df.drop_duplicates("Product_ID").sort_values("Product_ID").reset_index(drop=True)
+    product_ids = product_df["Product_ID"].to_numpy().astype(str)
+    category_idx, category_names = pd.factorize(product_df["Category"], sort=True)
+    store_ids = np.sort(daily_df["Store_ID"].unique()).astype(str)
+
+    product_idx = np.searchsorted(product_ids, daily_df["Product_ID"].to_numpy().astype(str))
+    store_idx = np.searchsorted(store_ids, daily_df["Store_ID"].to_numpy().astype(str))
+    log_price = np.log(daily_df["Revenue"].to_numpy(np.float64) / daily_df["Quantity"].to_numpy(np.float64))
+    log_quantity = np.log(daily_df["Quantity"].to_numpy(np.float64))
+    num_products, num_categories = len(product_ids), len(category_names)
+
+    # Within-product slopes from each product's own price variation
+    product_slope, product_var = _grouped_regression(product_idx, num_products, log_price, log_quantity)
+
+    # Category estimates pool the product slopes, weighting each by its precision
+    weight = 1 / (product_var + product_std ** 2)
+    weight_sum = np.bincount(category_idx, weight, num_categories)
+    pooled_slope = np.bincount(category_idx, weight * product_slope, num_categories) / np.maximum(weight_sum, 1e-300)
+    pooled_var = np.where(weight_sum > 0, 1 / np.maximum(weight_sum, 1e-300), np.inf)
+
+    category_elasticity, category_post_var = _shrink(pooled_slope, pooled_var, prior_elasticity, prior_std ** 2)
+    elasticity, elasticity_var = _shrink(product_slope, product_var, category_elasticity[category_idx],
+                                         category_post_var[category_idx] + product_std ** 2)
+
+    # Baseline demand: mean daily quantity per product and store over the last window_days
+    dates = pd.to_datetime(daily_df["Date"], format="ISO8601")
+    num_days = max(window_days, 1)
+    recent = (dates >= dates.max() - pd.Timedelta(days=num_days - 1)).to_numpy()
+    base_quantity = np.bincount(product_idx[recent] * len(store_ids) + store_idx[recent],
+                                daily_df["Quantity"].to_numpy(np.float64)[recent],
+                                minlength=num_products * len(store_ids)).reshape(num_products, len(store_ids))
+
+    return ElasticityIndex({
+        "product_ids": product_ids,
+        "store_ids": store_ids,
+        "category_names": np.asarray(category_names).astype(str),
+        "product_category": category_idx.astype(np.int16),
+        "elasticity": np.minimum(elasticity, 0).astype(np.float32),
+        "elasticity_std": np.sqrt(elasticity_var).astype(np.float32),
+        "category_elasticity": np.minimum(category_elasticity, 0).astype(np.float32),
+        "base_price": product_df["Price"].to_numpy(np.float32),
+        "unit_cost": product_df["Cost"].to_numpy(np.float32),
+        "base_quantity": (base_quantity / num_days).astype(np.float32)
+    })
+
+
+def main():
+    config = get_config()
+    configure_instrumentation(config)
+    db_path = config["database"]["path"]
+    pricing_config = config.get("pricing", {})
+
+    start_time = time.perf_counter()
+    daily_df = load_pricing_inputs(db_path)
+    db_admin = SQLiteDBAdmin(db_path)
+    db_admin.connect()
+    product_table = readable_table(db_admin.conn, "product_sdf")
+    product_df = pd.DataFrame(db_admin.execute_query(f"SELECT Product_ID, Category, Price, Cost FROM {product_table}"),
+                              columns=["Product_ID", "Category", "Price", "Cost"])
+    db_admin.close()
+
+    index = build_elasticity_index(daily_df, product_df,
+                                   prior_elasticity=pricing_config.get("prior_elasticity", -1.5),
+                                   prior_std=pricing_config.get("prior_std", 0.5),
+                                   product_std=pricing_config.get("product_std", 0.3),
+                                   window_days=pricing_config.get("window_days", 90))
+    index.save(pricing_config.get("index_path", "../../results/models/dynamic_pricing/elasticity_index.npz"))
+    print(f"Built elasticity index for {len(index.product_ids)} products x {len(index.store_ids)} stores "
+          f"({index.nbytes() / 1024:.1f} KB) in {time.perf_counter() - start_time:.2f}s")
+    for name, elasticity in zip(index.category_names, index.category_elasticity):
+        print(f"  {name}: elasticity {elasticity:.3f}")
+    return index
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+from functools import lru_cache
+import numpy as np
+from src.models.dynamic_pricing.elasticity import ElasticityIndex
+
+
+class PriceScorer:
+    """
+    Pick the profit-maximizing price for (product, store) pairs from an ElasticityIndex, in process.
+
+    Demand at a candidate price p follows the constant-elasticity curve around the current price
+    p0 and baseline daily quantity q0 of the pair:
+
+        quantity = q0 * (p / p0) ** elasticity
+        profit = (p - unit_cost) * quantity
+
+    Candidates are the current price times evenly spaced multipliers within price_range, never
+    below unit cost; pairs with no recent demand keep the candidate closest to p0. A batch of
+    pairs is scored as one (pairs x candidates) array; single lookups with the default candidates
+    are served from an LRU cache.
+    """
+
+    def __init__(self, index, cache_size=4096, candidate_count=41, price_range=(0.7, 1.3)):
+        """
+        :param index: ElasticityIndex, or a path to one saved with ElasticityIndex.save.
+        :param cache_size: Number of (product, store) results kept in the LRU cache.
+        :param candidate_count: Number of candidate prices per pair.
+        :param price_range: Lowest and highest candidate as a multiple of the current price.
+        """
+        self.index = index if isinstance(index, ElasticityIndex) else ElasticityIndex.load(index)
+        self.multipliers = np.linspace(price_range[0], price_range[1], candidate_count, dtype=np.float32)
+        # Bound per instance so every scorer has its own cache (and cache_info)
+        self._score_cached = lru_cache(maxsize=cache_size)(self._score_uncached)
+
+    def _lookup(self, product_ids, store_ids):
+        """Map IDs to index rows and columns; raises KeyError for unknown products or stores."""
+        rows = np.fromiter((self.index.product_rows[product_id] for product_id in product_ids), np.int64,
+                           len(product_ids))
+        columns = np.fromiter((self.index.store_columns[store_id] for store_id in store_ids), np.int64,
+                              len(store_ids))
+        return rows, columns
+
+    def _evaluate(self, rows, columns, prices):
+        """Score a (pairs x candidates) price array and keep the best candidate per pair."""
+        index = self.index
+        base_price = index.base_price[rows][:, None]
+        unit_cost = index.unit_cost[rows][:, None]
+        elasticity = index.elasticity[rows]
+        prices = np.maximum(prices, unit_cost)
+        quantity = index.base_quantity[rows, columns][:, None] * (prices / base_price) ** elasticity[:, None]
+        profit = (prices - unit_cost) * quantity
+        # Pairs without recent demand have no profitable candidate; they keep the current price
+        best = np.where(profit.max(axis=1) > 0, profit.argmax(axis=1), np.abs(prices - base_price).argmin(axis=1))
+        pairs = np.arange(len(rows))
+        return {
+            "best_price": prices[pairs, best],
+            "expected_quantity": quantity[pairs, best],
+            "expected_profit": profit[pairs, best],
+            "elasticity": elasticity
+        }
+
+    def score_batch(self, product_ids, store_ids, candidates=None):
+        """
+        Score many (product, store) pairs at once.
+
+        :param product_ids: Sequence of product IDs.
+        :param store_ids: Sequence of store IDs, one per product ID.
+        :param candidates: Optional array of candidate prices, shape (candidates,) or (pairs, candidates);
+                           defaults to the current price times the configured multipliers.
+        :return: Dictionary of arrays (one entry per pair): best_price, expected_quantity,
+                 expected_profit and elasticity.
+        """
+        rows, columns = self._lookup(product_ids, store_ids)
+        if candidates is None:
+            prices = self.index.base_price[rows][:, None] * self.multipliers
+        else:
+            prices = np.broadcast_to(np.asarray(candidates, dtype=np.float32), (len(rows), np.shape(candidates)[-1]))
+        return self._evaluate(rows, columns, prices)
+
+    def _score_uncached(self, product_id, store_id):
+        result = self.score_batch([product_id], [store_id])
+        return {name: float(values[0]) for name, values in result.items()}
+
+    def score(self, product_id, store_id, candidates=None):
+        """
+        Score a single (product, store) pair; results for the default candidates are cached.
+
+        :param product_id: Product ID.
+        :param store_id: Store ID.
+        :param candidates: Optional sequence of candidate prices (bypasses the cache).
+        :return: Dictionary with best_price, expected_quantity, expected_profit and elasticity.
+        """
+        if candidates is not None:
+            result = self.score_batch([product_id], [store_id], candidates)
+            return {name: float(values[0]) for name, values in result.items()}
+        return dict(self._score_cached(product_id, store_id))
+
+    def cache_info(self):
+        """Return the LRU cache statistics (hits, misses, maxsize, currsize)."""
+        return self._score_cached.cache_info()
+
+    def clear_cache(self):
+        """Drop cached results, e.g. after swapping in a rebuilt index."""
+        self._score_cached.cache_clear()
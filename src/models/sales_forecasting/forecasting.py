@@ -0,0 +1,208 @@
+import logging
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from src.data.database_operations import bulk_insert_dataframe_to_sqlite
+from src.models.sales_forecasting.series import load_panel_from_snapshot, load_panel_from_sqlite
+from src.utils.instrumentation import configure_instrumentation, traced
+from src.utils.spark_utils import get_config
+
+ALPHAS = [0.02, 0.05, 0.1, 0.2, 0.3, 0.5]
+GAMMAS = [0.01, 0.05, 0.1, 0.2]
+
+
+def seasonal_baseline(values, horizon, season_length=7, window_seasons=4):
+    """
+    Forecast every series with the mean of the same season position (weekday) over its last seasons.
+
+    :param values: Array of shape (series, days).
+    :param horizon: Number of days to forecast.
+    :param season_length: Length of the seasonal cycle in days.
+    :param window_seasons: Number of most recent seasons averaged.
+    :return: Array of shape (series, horizon).
+    """
+    window_seasons = max(1, min(window_seasons, values.shape[1] // season_length))
+    window = values[:, values.shape[1] - window_seasons * season_length:]
+    profile = window.reshape(len(values), window_seasons, season_length).mean(axis=1)
+    # Column j of the profile has the same season position as forecast step j (mod season_length)
+    return profile[:, np.arange(horizon) % season_length]
+
+
+def _select_states(level, season, sse, grid, num_days, season_length):
+    """Keep, per series, the states of the grid point with the lowest squared error."""
+    best = sse.argmin(axis=0)
+    series_idx = np.arange(sse.shape[1])
+    return {
+        "level": level[best, series_idx],
+        "season": season[:, best, series_idx].T,
+        "alpha": grid[best, 0],
+        "gamma": grid[best, 1],
+        "num_days": num_days,
+        "season_length": season_length
+    }
+
+
+@traced("forecasting.fit_seasonal_es")
+def fit_seasonal_es(values, season_length=7, alphas=None, gammas=None, checkpoint=None):
+    """
+    Fit additive seasonal exponential smoothing (level + seasonal, no trend) to all series at once.
+
+    The recursion runs once over the days, updating the states of every series and every
+    (alpha, gamma) pair of the grid as one array, so the Python loop is per day rather than per
+    series. Each series keeps the grid point with the lowest one-step-ahead squared error.
+
+        error = y[t] - (level + season[t % m])
+        level += alpha * error
+        season[t % m] += gamma * (1 - alpha) * error
+
+    :param values: Array of shape (series, days); needs at least two seasons of history.
+    :param season_length: Length of the seasonal cycle in days.
+    :param alphas: Level smoothing values to search (defaults to ALPHAS).
+    :param gammas: Seasonal smoothing values to search (defaults to GAMMAS).
+    :param checkpoint: Optional day index; the model fitted on values[:, :checkpoint] is captured
+                       during the same pass, which saves a second fit for backtesting.
+    :return: Dictionary with the final level, season and chosen alpha/gamma per series, or a
+             (checkpoint model, full model) tuple when checkpoint is given.
+    """
+    num_series, num_days = values.shape
+    grid = np.array([(alpha, gamma) for alpha in alphas or ALPHAS for gamma in gammas or GAMMAS])
+    alpha = grid[:, 0][:, None]
+    gamma = grid[:, 1][:, None]
+
+    # Initial states from the first (up to four) whole seasons; errors are scored after them
+    init_seasons = max(1, min(4, (checkpoint or num_days) // season_length - 1))
+    init_days = init_seasons * season_length
+    level0 = values[:, :init_days].mean(axis=1)
+    season0 = values[:, :init_days].reshape(num_series, init_seasons, season_length).mean(axis=1) - level0[:, None]
+
+    level = np.repeat(level0[None, :], len(grid), axis=0)
+    # Laid out as (season position, grid, series) so each day's update touches one contiguous block
+    season = np.repeat(season0.T[:, None, :], len(grid), axis=1)
+    sse = np.zeros((len(grid), num_series))
+    checkpoint_model = None
+    for t in range(num_days):
+        if t == checkpoint:
+            checkpoint_model = _select_states(level, season, sse, grid, t, season_length)
+        position = t % season_length
+        error = values[:, t] - (level + season[position])
+        if t >= init_days:
+            sse += error * error
+        level += alpha * error
+        season[position] += gamma * (1 - alpha) * error
+
+    model = _select_states(level, season, sse, grid, num_days, season_length)
+    return (checkpoint_model, model) if checkpoint is not None else model
+
+
+def forecast_seasonal_es(model, horizon):
+    """
+    Forecast from fitted seasonal exponential smoothing states.
+
+    :param model: Dictionary returned by fit_seasonal_es.
+    :param horizon: Number of days to forecast.
+    :return: Array of shape (series, horizon).
+    """
+    positions = (model["num_days"] + np.arange(horizon)) % model["season_length"]
+    return model["level"][:, None] + model["season"][:, positions]
+
+
+def forecast_panel(panel, horizon=28, holdout_days=28, season_length=7, alphas=None, gammas=None):
+    """
+    Forecast all series of a panel, choosing per series between the seasonal baseline and seasonal ES.
+
+    Both models are first fitted without the last holdout_days and scored by MAE on them; each
+    series then uses the model with the lower holdout MAE, refitted on the full history.
+
+    :param panel: Panel dictionary from src.models.sales_forecasting.series.
+    :param horizon: Number of days to forecast.
+    :param holdout_days: Days held out to choose the model per series.
+    :param season_length: Length of the seasonal cycle in days.
+    :param alphas: Level smoothing values to search.
+    :param gammas: Seasonal smoothing values to search.
+    :return: Tuple of (forecast DataFrame in long format, report dictionary).
+    :raises ValueError: If holdout_days is not positive or leaves less than two seasons of training history.
+    """
+    values = panel["values"]
+    num_series = len(values)
+    max_holdout = values.shape[1] - 2 * season_length
+    if not 0 < holdout_days <= max_holdout:
+        raise ValueError(f"holdout_days must be between 1 and {max_holdout} (the {values.shape[1]} days of history "
+                         f"minus two seasons of {season_length} days), got {holdout_days}")
+    start_time = time.perf_counter()
+
+    # One smoothing pass yields both the model fitted before the holdout and the full-history model
+    train_days = values.shape[1] - holdout_days
+    es_backtest, es_model = fit_seasonal_es(values, season_length, alphas, gammas, checkpoint=train_days)
+    backtest = {
+        "seasonal_baseline": seasonal_baseline(values[:, :train_days], holdout_days, season_length),
+        "seasonal_es": forecast_seasonal_es(es_backtest, holdout_days)
+    }
+    model_names = list(backtest)
+    mae = np.stack([np.abs(values[:, train_days:] - backtest[name]).mean(axis=1) for name in model_names])
+    chosen = mae.argmin(axis=0)
+
+    forecasts = {
+        "seasonal_baseline": seasonal_baseline(values, horizon, season_length),
+        "seasonal_es": forecast_seasonal_es(es_model, horizon)
+    }
+    stacked = np.stack([forecasts[name] for name in model_names])
+    forecast = np.clip(stacked[chosen, np.arange(num_series)], 0, None)
+    elapsed = time.perf_counter() - start_time
+
+    forecast_dates = pd.date_range(panel["dates"][-1] + pd.Timedelta(days=1), periods=horizon)
+    forecast_df = pd.DataFrame({
+        "Product_ID": np.repeat(panel["keys"]["Product_ID"].to_numpy(), horizon),
+        "Store_ID": np.repeat(panel["keys"]["Store_ID"].to_numpy(), horizon),
+        "Date": np.tile(forecast_dates.values, num_series),
+        "Forecast_Quantity": np.round(forecast.ravel(), 4),
+        "Model": np.repeat(np.array(model_names, dtype=object)[chosen], horizon),
+        "Forecast_Origin": panel["dates"][-1].strftime("%Y-%m-%d"),
+        "Created_At": datetime.now().isoformat(sep=" ", timespec="seconds")
+    })
+    report = {
+        "series": num_series,
+        "days": values.shape[1],
+        "horizon": horizon,
+        "seconds": round(elapsed, 3),
+        "series_per_sec": round(num_series / elapsed, 1) if elapsed > 0 else None,
+        "holdout_mae": {name: round(float(mae[i].mean()), 4) for i, name in enumerate(model_names)},
+        "selected_mae": round(float(mae.min(axis=0).mean()), 4),
+        "models_chosen": {name: int((chosen == i).sum()) for i, name in enumerate(model_names)}
+    }
+    return forecast_df, report
+
+
+def main():
+    config = get_config()
+    configure_instrumentation(config)
+    db_path = config["database"]["path"]
+    forecasting_config = config.get("forecasting", {})
+    target = forecasting_config.get("target", "Quantity_Sold")
+
+    start_time = time.perf_counter()
+    if forecasting_config.get("source", "sqlite") == "parquet":
+        panel = load_panel_from_snapshot(config["snapshot"]["path"], target=target,
+                                         compact=config["data_generation"].get("compact", False))
+    else:
+        panel = load_panel_from_sqlite(db_path, target=target)
+    load_seconds = time.perf_counter() - start_time
+    logging.info(f"Loaded {len(panel['keys'])} series x {len(panel['dates'])} days in {load_seconds:.2f}s")
+
+    forecast_df, report = forecast_panel(panel,
+                                         horizon=forecasting_config.get("horizon", 28),
+                                         holdout_days=forecasting_config.get("holdout_days", 28),
+                                         season_length=forecasting_config.get("season_length", 7),
+                                         alphas=forecasting_config.get("alphas"),
+                                         gammas=forecasting_config.get("gammas"))
+    bulk_insert_dataframe_to_sqlite(forecast_df, forecasting_config.get("output_table", "sales_forecasts"), db_path,
+                                    pragmas={})
+    print(f"Forecast {report['series']} series ({report['days']} days of history, horizon {report['horizon']}) "
+          f"in {report['seconds']}s: {report['series_per_sec']} series/sec")
+    print(f"Holdout MAE per model: {report['holdout_mae']}, selected: {report['selected_mae']}, "
+          f"chosen: {report['models_chosen']}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import os
+import numpy as np
+import pandas as pd
+from src.data.compact import decode_ids, key_column, readable_table
+from src.data.database_operations import SQLiteDBAdmin
+from src.utils.instrumentation import traced
+
+SERIES_KEYS = ["Product_ID", "Store_ID"]
+
+
+def build_panel(daily_df, target="Quantity_Sold"):
+    """
+    Turn long (Product_ID, Store_ID, Date, target) rows into a dense series x day array.
+
+    Days without sales are zero. Rows for the same series and day are summed.
+
+    :param daily_df: pandas DataFrame with the series keys, Date and the target column.
+    :param target: Name of the column to forecast.
+    :return: Dictionary with "values" (float64 array, one row per series), "keys" (DataFrame of
+             Product_ID/Store_ID per row) and "dates" (DatetimeIndex of the columns).
+    """
+    dates = pd.to_datetime(daily_df["Date"], format="ISO8601").dt.normalize()
+    start_date = dates.min()
+    num_days = (dates.max() - start_date).days + 1
+    day_idx = (dates - start_date).dt.days.to_numpy()
+    series_groups = daily_df.groupby(SERIES_KEYS, sort=True)
+    series_idx = series_groups.ngroup().to_numpy()
+    keys = series_groups.size().index.to_frame(index=False)
+
+    values = np.bincount(series_idx * num_days + day_idx, weights=daily_df[target].to_numpy(dtype=np.float64),
+                         minlength=len(keys) * num_days).reshape(len(keys), num_days)
+    return {"values": values, "keys": keys, "dates": pd.date_range(start_date, periods=num_days)}
+
+
+@traced("forecasting.load_sqlite", rows=lambda panel: len(panel["keys"]))
+def load_panel_from_sqlite(db_path, table_name="sales_sdf", target="Quantity_Sold", batch_size=100000):
+    """
+    Aggregate daily totals per product x store in SQLite and load them as a dense panel.
+
+    The GROUP BY runs inside SQLite (served by the Product_ID, Store_ID, Date covering index when
+    it exists), so only one row per series and day crosses into Python, fetched in batches.
+
+    :param db_path: Path to the SQLite database.
+    :param table_name: The sales table (read through its <table>_wide view when stored compact).
+    :param target: Column to sum per day.
+    :param batch_size: Rows fetched per batch.
+    :return: Panel dictionary (see build_panel).
+    """
+    db_admin = SQLiteDBAdmin(db_path)
+    db_admin.connect()
+    query = (f"SELECT Product_ID, Store_ID, Date, SUM({target}) AS {target} "
+             f"FROM {readable_table(db_admin.conn, table_name)} GROUP BY Product_ID, Store_ID, Date")
+    daily_df = pd.concat(db_admin.iter_query_batches(query, batch_size=batch_size), ignore_index=True)
+    db_admin.close()
+    return build_panel(daily_df, target)
+
+
+@traced("forecasting.load_parquet", rows=lambda panel: len(panel["keys"]))
+def load_panel_from_snapshot(snapshot_dir, table_name="sales_sdf", target="Quantity_Sold", compact=False):
+    """
+    Load the panel from the table's Parquet snapshot (see src.utils.snapshot_cache) without Spark.
+
+    Only the key, Date and target columns are read from the columnar files.
+
+    :param snapshot_dir: Directory holding one snapshot directory per table.
+    :param table_name: The sales table.
+    :param target: Column to sum per day.
+    :param compact: Whether the snapshot holds the compact layout (surrogate keys instead of IDs).
+    :return: Panel dictionary (see build_panel).
+    """
+    data_path = os.path.join(snapshot_dir, table_name, "data")
+    if compact:
+        sales_df = pd.read_parquet(data_path, columns=[key_column(key) for key in SERIES_KEYS] + ["Date", target])
+        sales_df = sales_df.rename(columns={key_column(key): key for key in SERIES_KEYS})
+        for key in SERIES_KEYS:
+            sales_df[key] = decode_ids(sales_df[key].to_numpy(), key)
+    else:
+        sales_df = pd.read_parquet(data_path, columns=SERIES_KEYS + ["Date", target])
+    daily_df = sales_df.groupby(SERIES_KEYS + ["Date"], as_index=False, observed=True)[target].sum()
+    return build_panel(daily_df, target)
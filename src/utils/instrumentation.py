@@ -0,0 +1,277 @@
+import atexit
+import cProfile
+import functools
+import logging
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from src.utils.logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+# Tracing is off unless enabled from the config or RETAIL_TRACE; disabled spans are a global flag check
+_enabled = os.environ.get("RETAIL_TRACE", "") not in ("", "0")
+_profile_stages = set()
+_profile_mode = "cprofile"
+_profile_dir = None
+_sample_interval = 0.005
+_stats = {}
+_stats_lock = threading.Lock()
+_local = threading.local()
+_summary_registered = False
+
+
+def _emit(message):
+    """Log at INFO, or print when logging has not been set up (the data scripts report through print)."""
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(message)
+    else:
+        print(message)
+
+
+def _current_rss_mb():
+    """Current resident set size in MB (falls back to the peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class _SamplingProfiler:
+    """Samples the stack of one thread at a fixed interval; much cheaper than cProfile on tight loops."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                code = frame.f_code
+                self.samples[f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"] += 1
+
+    def enable(self):
+        self._thread.start()
+
+    def disable(self):
+        self._stop.set()
+        self._thread.join()
+
+    def report(self, limit=15):
+        total = sum(self.samples.values()) or 1
+        return "\n".join(f"{count / total:6.1%}  {location}" for location, count in self.samples.most_common(limit))
+
+
+class _NullSpan:
+    """Shared no-op span returned while tracing is disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    @property
+    def rows(self):
+        return None
+
+    @rows.setter
+    def rows(self, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """A timed section; set .rows inside the block to record how many rows it processed."""
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.seconds = None
+        self.memory_delta_mb = None
+        self._profiler = None
+
+    def __enter__(self):
+        if _profile_stages and not getattr(_local, "profiling", False) and \
+                ("*" in _profile_stages or self.name in _profile_stages):
+            _local.profiling = True
+            if _profile_mode == "sampling":
+                self._profiler = _SamplingProfiler(threading.get_ident(), _sample_interval)
+            else:
+                self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._rss_before = _current_rss_mb()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.seconds = time.perf_counter() - self._start
+        self.memory_delta_mb = _current_rss_mb() - self._rss_before
+        if self._profiler is not None:
+            self._profiler.disable()
+            _local.profiling = False
+            self._report_profile()
+        _record(self, failed=exc_type is not None)
+        logger.debug(f"{self.name}: {self.seconds:.3f}s"
+                     f"{f', {self.rows} rows' if self.rows is not None else ''}, {self.memory_delta_mb:+.1f} MB")
+        return False
+
+    def _report_profile(self):
+        if isinstance(self._profiler, _SamplingProfiler):
+            _emit(f"Sampling profile for {self.name} ({sum(self._profiler.samples.values())} samples):\n"
+                  f"{self._profiler.report()}")
+            return
+        if _profile_dir:
+            os.makedirs(_profile_dir, exist_ok=True)
+            file_name = f"{self.name.replace('/', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.prof"
+            self._profiler.dump_stats(os.path.join(_profile_dir, file_name))
+        stats = pstats.Stats(self._profiler)
+        stats.sort_stats("cumulative")
+        top = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:15]
+        _emit(f"cProfile for {self.name} (top by cumulative time):\n" + "\n".join(
+            f"{cumulative:9.3f}s {calls:>9}  {function} ({os.path.basename(file_name)}:{line})"
+            for (file_name, line, function), (_, calls, _, cumulative, _) in top))
+
+
+def _record(span_obj, failed=False):
+    with _stats_lock:
+        entry = _stats.setdefault(span_obj.name, {"name": span_obj.name, "calls": 0, "seconds": 0.0,
+                                                  "max_seconds": 0.0, "rows": 0, "max_memory_delta_mb": 0.0,
+                                                  "errors": 0})
+        entry["calls"] += 1
+        entry["seconds"] += span_obj.seconds
+        entry["max_seconds"] = max(entry["max_seconds"], span_obj.seconds)
+        entry["rows"] += span_obj.rows or 0
+        entry["max_memory_delta_mb"] = max(entry["max_memory_delta_mb"], span_obj.memory_delta_mb)
+        entry["errors"] += int(failed)
+
+
+def span(name, rows=None):
+    """
+    Time a block of code while tracing is enabled.
+
+    with span("load.sales") as s:
+        s.rows = load_sales()
+
+    :param name: Span name; spans with the same name are aggregated in the summary.
+    :param rows: Optional row count known up front.
+    :return: A Span, or a shared no-op span when tracing is disabled.
+    """
+    return Span(name, rows) if _enabled else _NULL_SPAN
+
+
+def traced(name=None, rows=None):
+    """
+    Decorator that wraps each call of a function in a span.
+
+    :param name: Span name (defaults to the function's qualified name).
+    :param rows: Optional callable mapping the return value to a row count, e.g. len.
+    :return: The decorator.
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(span_name) as active:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    active.rows = rows(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def enable_tracing(profile=None, profile_mode="cprofile", profile_dir=None, sample_interval=0.005,
+                   summary_at_exit=True):
+    """
+    Turn tracing on for this process.
+
+    :param profile: Span names to profile, or ["*"] for every span. Profiles never nest within a thread.
+    :param profile_mode: "cprofile" (deterministic, .prof files in profile_dir) or "sampling" (stack samples).
+    :param profile_dir: Directory for cProfile .prof dumps; None only logs the top functions.
+    :param sample_interval: Seconds between stack samples in sampling mode.
+    :param summary_at_exit: Log the span summary when the process exits.
+    """
+    global _enabled, _profile_stages, _profile_mode, _profile_dir, _sample_interval, _summary_registered
+    _enabled = True
+    _profile_stages = set(profile or [])
+    _profile_mode = profile_mode
+    _profile_dir = profile_dir
+    _sample_interval = sample_interval
+    if summary_at_exit and not _summary_registered:
+        atexit.register(log_summary)
+        _summary_registered = True
+
+
+def disable_tracing():
+    """Turn tracing off; recorded statistics are kept until reset_stats."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def configure_instrumentation(config):
+    """
+    Enable tracing from the "instrumentation" section of the configuration (or the RETAIL_TRACE variable).
+
+    :param config: The loaded configuration dictionary.
+    """
+    settings = config.get("instrumentation", {})
+    if settings.get("enabled", False) or _enabled:
+        enable_tracing(profile=settings.get("profile"), profile_mode=settings.get("profile_mode", "cprofile"),
+                       profile_dir=settings.get("profile_dir"),
+                       sample_interval=settings.get("sample_interval", 0.005))
+
+
+def get_summary():
+    """
+    Aggregated span statistics, slowest first.
+
+    :return: List of dictionaries with calls, total/max seconds, rows, rows/sec, memory delta and errors.
+    """
+    with _stats_lock:
+        entries = [dict(entry) for entry in _stats.values()]
+    for entry in entries:
+        entry["rows_per_sec"] = (round(entry["rows"] / entry["seconds"], 1)
+                                 if entry["rows"] and entry["seconds"] else None)
+    return sorted(entries, key=lambda entry: entry["seconds"], reverse=True)
+
+
+def log_summary():
+    """Log the end-of-run span summary as a table."""
+    summary = get_summary()
+    if not summary:
+        return
+    lines = [f"{'span':<45} {'calls':>7} {'total s':>9} {'max s':>8} {'rows':>11} {'rows/s':>11} {'max MB':>8}"]
+    for entry in summary:
+        lines.append(f"{entry['name'][:45]:<45} {entry['calls']:>7} {entry['seconds']:>9.3f} "
+                     f"{entry['max_seconds']:>8.3f} {entry['rows'] or '':>11} {entry['rows_per_sec'] or '':>11} "
+                     f"{entry['max_memory_delta_mb']:>+8.1f}")
+        if entry["errors"]:
+            lines[-1] += f"  ({entry['errors']} failed)"
+    _emit("Run summary:\n" + "\n".join(lines))
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
@@ -1,31 +1,224 @@
+import atexit
 import logging
+import logging.handlers
 import os
-from src.utils.spark_utils import load_config
-from datetime import datetime
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
 
+_listener = None
+
+
+class DailyRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Write to <log_directory>/application_YYYYMMDD.log, switching files at midnight and rolling the
+    current day's file over to .1, .2, ... when it exceeds max_bytes.
+
+    Records are flushed in batches (every batch_size records or flush_interval seconds) instead of
+    after every record. With batching on, a background timer also flushes a batch that has been
+    pending for flush_interval seconds, so the tail of a burst does not wait for the next record;
+    close() stops and joins it.
+    """
+
+    def __init__(self, log_directory, max_bytes=0, backup_count=0, batch_size=1, flush_interval=0.0):
+        self.log_directory = log_directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._set_day(datetime.now())
+        super().__init__(self._day_path, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+        self._stop_timer = threading.Event()
+        self._timer = None
+        if batch_size > 1 and flush_interval > 0:
+            self._timer = threading.Thread(target=self._flush_when_idle, name="log-flush", daemon=True)
+            self._timer.start()
+
+    def _flush_when_idle(self):
+        while not self._stop_timer.wait(self.flush_interval):
+            # close() may hold the lock while it waits for this thread (logging.shutdown does), so
+            # never block on it: give up after one interval and re-check whether to stop
+            if not self.lock.acquire(timeout=self.flush_interval):
+                continue
+            try:
+                if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+                    self.force_flush()
+            finally:
+                self.lock.release()
+
+    def _set_day(self, now):
+        self._day_path = os.path.join(self.log_directory, f"application_{now.strftime('%Y%m%d')}.log")
+        self._next_day = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+    def shouldRollover(self, record):
+        return record.created >= self._next_day or super().shouldRollover(record)
+
+    def doRollover(self):
+        if time.time() >= self._next_day:
+            # New day: start the next dated file rather than renaming the current one
+            if self.stream:
+                self.stream.close()
+                self.stream = None
+            self._set_day(datetime.now())
+            self.baseFilename = os.path.abspath(self._day_path)
+        else:
+            super().doRollover()
+
+    def flush(self):
+        # Called by StreamHandler.emit after every record; only hit the disk once per batch
+        self._pending += 1
+        if self._pending >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.force_flush()
+
+    def force_flush(self):
+        with self.lock:
+            super().flush()
+            self._pending = 0
+            self._last_flush = time.monotonic()
+
+    def close(self):
+        self._stop_timer.set()
+        if self._timer is not None and self._timer is not threading.current_thread():
+            self._timer.join()
+            self._timer = None
+        self.force_flush()
+        super().close()
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let through at most max_repeats identical messages (same logger, level and text) per window_seconds.
+
+    When a message's window expires, its next occurrence notes how many repeats were suppressed.
+    Each record is counted once: the decision is stored on the record, so a filter shared by
+    several handlers gives every handler the same answer.
+    """
+
+    def __init__(self, window_seconds=10.0, max_repeats=20):
+        super().__init__()
+        self.window_seconds = window_seconds
+        self.max_repeats = max_repeats
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        decision = getattr(record, "_rate_limit_passed", None)
+        if decision is not None:
+            return decision
+        record._rate_limit_passed = self._decide(record)
+        return record._rate_limit_passed
+
+    def _decide(self, record):
+        key = (record.name, record.levelno, record.msg)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or record.created - window[0] >= self.window_seconds:
+                suppressed = window[2] if window else 0
+                if len(self._windows) > 10000:
+                    self._prune(record.created)
+                self._windows[key] = [record.created, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+                    record.args = None
+                return True
+            window[1] += 1
+            if window[1] > self.max_repeats:
+                window[2] += 1
+                return False
+            return True
+
+    def _prune(self, now):
+        self._windows = {key: window for key, window in self._windows.items()
+                         if now - window[0] < self.window_seconds}
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking (or erroring) when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level=logging.INFO, async_mode=None):
+    """
+    Sets up logging configuration for the application.
+
+    With async_mode (or "async": true in the logging config) the root logger only gets a queue
+    handler; a background listener thread does the file and console I/O, so log calls in hot loops
+    never wait on the disk. The listener is stopped and flushed at exit (or by stop_logging).
+
+    :param level: Logging level of the root logger.
+    :param async_mode: Use the queued handler; defaults to the "async" setting in the logging config.
+    """
+    global _listener
+    # Imported here so instrumentation (used by spark_utils' dependencies) can import this module
+    from src.utils.spark_utils import get_config
 
-def setup_logging(level=logging.INFO):
-    """Sets up logging configuration for the application."""
     # Define the format for logging
-    config = load_config()
+    config = get_config()
+    logging_config = config["logging"]
     logging_format = '%(asctime)s - %(levelname)s - %(message)s'
+    async_mode = logging_config.get("async", False) if async_mode is None else async_mode
 
-    log_directory = config["logging"]["path"]
+    log_directory = logging_config["path"]
     os.makedirs(log_directory, exist_ok=True)
 
-    date_path = datetime.now().strftime("%Y%m%d")
-    # Define the log file path
-    log_file_path = os.path.join(log_directory, f'application_{date_path}.log')
+    # Dated log file, rotated by size within the day
+    file_handler = DailyRotatingFileHandler(log_directory,
+                                            max_bytes=logging_config.get("max_bytes", 0),
+                                            backup_count=logging_config.get("backup_count", 0),
+                                            batch_size=logging_config.get("batch_size", 100) if async_mode else 1,
+                                            flush_interval=logging_config.get("flush_interval", 1.0))
+    handlers = [
+        file_handler,  # Outputs logs to a file
+        logging.StreamHandler()  # Outputs logs to the console
+    ]
+    rate_limit = logging_config.get("rate_limit")
+    rate_filter = RateLimitFilter(**rate_limit) if rate_limit else None
+
+    if async_mode:
+        stop_logging()
+        formatter = logging.Formatter(logging_format)
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        queue_handler = _DroppingQueueHandler(queue.Queue(maxsize=logging_config.get("queue_size", 10000)))
+        # The listener applies the real format; the queue handler must only pass the message through
+        queue_handler.setFormatter(logging.Formatter('%(message)s'))
+        if rate_filter:
+            # Filter before enqueueing so suppressed records cost no formatting or queue traffic
+            queue_handler.addFilter(rate_filter)
+        _listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+        handlers = [queue_handler]
+    elif rate_filter:
+        # Shared by both handlers; the filter decides each record once
+        for handler in handlers:
+            handler.addFilter(rate_filter)
 
     # Configure the logging
-    logging.basicConfig(
-        level=level,
-        format=logging_format,
-        handlers=[
-            logging.FileHandler(log_file_path),  # Outputs logs to a file
-            logging.StreamHandler()  # Outputs logs to the console
-        ]
-    )
+    logging.basicConfig(level=level, format=logging_format, handlers=handlers, force=async_mode)
+
+
+def stop_logging():
+    """Stop the background log listener, writing out every queued record and flushing the log file."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            if isinstance(handler, DailyRotatingFileHandler):
+                handler.force_flush()
+            else:
+                handler.flush()
+        _listener = None
 
 
 def get_logger(name):
@@ -0,0 +1,270 @@
+import importlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+import numpy as np
+from src.data.database_operations import get_connection_manager
+
+# Columns the registry needs on top of the original model_info schema; added to existing tables
+REGISTRY_COLUMNS = [
+    "Model_Name TEXT",
+    "File_Path TEXT",
+    "Saved_At TIMESTAMP",
+    "Version INTEGER",
+    "Status TEXT",
+    "Model_Format TEXT",
+    "Model_Class TEXT",
+    "Artifact_Bytes INTEGER",
+    "Metrics TEXT"
+]
+
+
+class ModelCache:
+    """
+    Thread-safe, process-local LRU cache of loaded models keyed by artifact path.
+
+    Entries are evicted least recently used first once there are more than max_entries or their
+    artifacts add up to more than max_bytes (the on-disk size is the estimate of a model's weight).
+    """
+
+    def __init__(self, max_entries=8, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def put(self, key, model, size_bytes=0):
+        with self._lock:
+            self._entries[key] = (model, size_bytes or 0)
+            self._entries.move_to_end(key)
+            total_bytes = sum(size for _, size in self._entries.values())
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or
+                                              (self.max_bytes and total_bytes > self.max_bytes)):
+                _, (_, size) = self._entries.popitem(last=False)
+                total_bytes -= size
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Return the hit, miss and eviction counters with the current size.
+
+        :return: Dictionary of counters.
+        """
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries),
+                    "bytes": sum(size for _, size in self._entries.values())}
+
+
+_model_cache = ModelCache()
+
+
+def get_model_cache():
+    """Return the process-wide model cache shared by every registry."""
+    return _model_cache
+
+
+def configure_model_cache(max_entries=8, max_bytes=None):
+    """
+    Resize the process-wide model cache, evicting entries that no longer fit on the next insert.
+
+    :param max_entries: Most models kept loaded.
+    :param max_bytes: Most artifact bytes kept loaded, or None for no limit.
+    """
+    _model_cache.max_entries = max_entries
+    _model_cache.max_bytes = max_bytes
+
+
+def artifact_size(path):
+    """Size of a saved model in bytes: the file, or every file under the directory Spark writes."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(directory, name))
+               for directory, _, names in os.walk(path) for name in names)
+
+
+def _is_numpy_model(model):
+    return isinstance(model, np.ndarray) or (isinstance(model, dict) and
+                                             all(isinstance(value, np.ndarray) for value in model.values()))
+
+
+class ModelRegistry:
+    """
+    Versioned model store on the model_info table.
+
+    Versions are allocated inside a BEGIN IMMEDIATE transaction that also inserts a "pending"
+    row, so concurrent trainers of the same model always get distinct versions. Once the
+    artifact is written the row is completed with its size, format and metrics. Loaded models
+    are kept in the process-wide ModelCache so scorers do not reload them on every request.
+
+    Spark models (anything with save/load) are saved as directories; NumPy models (an array or
+    a dict of arrays) as .npz files.
+    """
+
+    def __init__(self, db_path, root="./results/models", columns=None, table_name="model_info", cache=None):
+        """
+        :param db_path: Path to the SQLite database.
+        :param root: Directory under which models are saved as <date>/<name>_v<version>.
+        :param columns: Column definitions of the table (defaults to REGISTRY_COLUMNS); missing
+                        columns are added to an existing table.
+        :param table_name: The registry table.
+        :param cache: ModelCache to use; defaults to the process-wide one.
+        """
+        self.db_path = db_path
+        self.root = root
+        self.table_name = table_name
+        self.manager = get_connection_manager(db_path, wal=True)
+        self.cache = cache or get_model_cache()
+        self._ensure_table(columns or REGISTRY_COLUMNS)
+
+    def _ensure_table(self, columns):
+        columns = list(columns) + [column for column in REGISTRY_COLUMNS
+                                   if column.split()[0] not in {c.split()[0] for c in columns}]
+        with self.manager.transaction() as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table_name} ({', '.join(columns)})")
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({self.table_name})")}
+            for column in columns:
+                if column.split()[0] not in existing:
+                    conn.execute(f"ALTER TABLE {self.table_name} ADD COLUMN {column.strip()}")
+        try:
+            self.manager.connection().execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{self.table_name}_name_version "
+                                              f"ON {self.table_name} (Model_Name, Version)")
+        except sqlite3.IntegrityError:
+            # Tables written before the registry may already hold duplicate versions
+            print(f"Duplicate versions in {self.table_name}; version uniqueness is not enforced by an index.")
+
+    def allocate_version(self, model_name, model_format, extension=""):
+        """
+        Reserve the next version of a model by inserting its pending row.
+
+        :param model_name: The name of the model.
+        :param model_format: "spark" or "numpy".
+        :param extension: File extension of the artifact.
+        :return: Tuple of (version, file path to save the artifact to).
+        """
+        date_path = datetime.now().strftime("%Y%m%d")
+        with self.manager.transaction() as conn:
+            result = conn.execute(f"SELECT MAX(Version) FROM {self.table_name} WHERE Model_Name = ?",
+                                  (model_name,)).fetchone()
+            version = (result[0] or 0) + 1
+            file_path = f"{self.root}/{date_path}/{model_name}_v{version}{extension}"
+            conn.execute(f"INSERT INTO {self.table_name} (Model_Name, Version, File_Path, Status, Model_Format) "
+                         f"VALUES (?, ?, ?, 'pending', ?)", (model_name, version, file_path, model_format))
+        return version, file_path
+
+    def save(self, model, model_name, metrics=None, **columns):
+        """
+        Save a model under the next version and record it.
+
+        :param model: Spark model or NumPy array / dict of arrays.
+        :param model_name: The name of the model.
+        :param metrics: Optional dictionary of metrics, stored as JSON.
+        :param columns: Values for other model_info columns (e.g. Silhouette_Score=0.7).
+        :return: Tuple of (file path, version).
+        """
+        numpy_model = _is_numpy_model(model)
+        version, file_path = self.allocate_version(model_name, "numpy" if numpy_model else "spark",
+                                                   ".npz" if numpy_model else "")
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            if numpy_model:
+                np.savez_compressed(file_path, **(model if isinstance(model, dict) else {"array": model}))
+            else:
+                model.save(file_path)
+        except Exception:
+            with self.manager.transaction() as conn:
+                conn.execute(f"UPDATE {self.table_name} SET Status = 'failed' WHERE Model_Name = ? AND Version = ?",
+                             (model_name, version))
+            raise
+
+        values = {
+            "Saved_At": datetime.now().isoformat(sep=" "),
+            "Status": "ready",
+            "Model_Class": None if numpy_model else f"{type(model).__module__}.{type(model).__name__}",
+            "Artifact_Bytes": artifact_size(file_path),
+            "Metrics": json.dumps(metrics) if metrics else None,
+            **columns
+        }
+        with self.manager.transaction() as conn:
+            conn.execute(f"UPDATE {self.table_name} SET {', '.join(f'{name} = ?' for name in values)} "
+                         f"WHERE Model_Name = ? AND Version = ?", (*values.values(), model_name, version))
+        print(f"Saved {model_name} v{version} to {file_path} ({values['Artifact_Bytes'] / 1024:.1f} KB)")
+        return file_path, version
+
+    def get(self, model_name, version=None):
+        """
+        Look up a saved model's record.
+
+        :param model_name: The name of the model.
+        :param version: The version, or None for the latest ready version (rows written before
+                        the registry count as ready).
+        :return: Dictionary of the row (Metrics decoded), or None if there is no such model.
+        """
+        query = f"SELECT * FROM {self.table_name} WHERE Model_Name = ? AND COALESCE(Status, 'ready') = 'ready'"
+        params = (model_name,)
+        if version is not None:
+            query += " AND Version = ?"
+            params += (version,)
+        cursor = self.manager.connection().execute(query + " ORDER BY Version DESC LIMIT 1", params)
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        record = dict(zip([description[0] for description in cursor.description], row))
+        record["Metrics"] = json.loads(record["Metrics"]) if record.get("Metrics") else {}
+        return record
+
+    def list_versions(self, model_name):
+        """
+        :param model_name: The name of the model.
+        :return: List of (version, saved at, artifact bytes, status) tuples, oldest first.
+        """
+        return self.manager.connection().execute(
+            f"SELECT Version, Saved_At, Artifact_Bytes, Status FROM {self.table_name} WHERE Model_Name = ? "
+            f"ORDER BY Version", (model_name,)).fetchall()
+
+    def load(self, model_name, version=None):
+        """
+        Load a saved model, serving repeated loads of the same artifact from the cache.
+
+        :param model_name: The name of the model.
+        :param version: The version, or None for the latest ready version.
+        :return: The Spark model, NumPy array or dict of arrays.
+        """
+        record = self.get(model_name, version)
+        if record is None:
+            raise KeyError(f"No saved model {model_name}" + (f" v{version}" if version is not None else ""))
+        file_path = record["File_Path"]
+        model = self.cache.get(file_path)
+        if model is None:
+            model = _load_artifact(record)
+            self.cache.put(file_path, model, record.get("Artifact_Bytes"))
+        return model
+
+
+def _load_artifact(record):
+    """Read an artifact from disk according to its recorded format and class."""
+    if record.get("Model_Format") == "numpy":
+        with np.load(record["File_Path"], allow_pickle=False) as arrays:
+            model = {name: arrays[name] for name in arrays.files}
+        return model["array"] if list(model) == ["array"] else model
+    module_name, _, class_name = (record.get("Model_Class") or "").rpartition(".")
+    if not module_name:
+        raise ValueError(f"Model {record['Model_Name']} v{record['Version']} has no recorded model class")
+    return getattr(importlib.import_module(module_name), class_name).load(record["File_Path"])
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+from src.utils.spark_utils import read_dataframe_from_sqlite
+
+
+def _schema_columns(table_name, table_schemas):
+    """Return the column names declared in data_table_schemas for a table such as "sales_sdf"."""
+    schema_name = table_name[:-4] if table_name.endswith("_sdf") else table_name
+    for name, columns in table_schemas.items():
+        if name.lower() == schema_name.lower():
+            return [column.split()[0] for column in columns]
+    return []
+
+
+# Rows hashed per fingerprint, at evenly spaced rowids from the first to the last
+FINGERPRINT_PROBES = 16
+
+
+def _file_stats(db_path):
+    """mtime and size of the database file and of its -wal file, where committed WAL writes live."""
+    stats = []
+    for path in (db_path, f"{db_path}-wal"):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            stats.append([stat.st_mtime, stat.st_size])
+        else:
+            stats.append(None)
+    return stats
+
+
+def source_fingerprint(db_path, table_name):
+    """
+    Fingerprint an SQLite table so a snapshot can tell whether its source changed.
+
+    Besides the row count and rowid range, the fingerprint hashes the table definition and the rows
+    at FINGERPRINT_PROBES evenly spaced rowids, so a reload that writes the same number of rows
+    with different values is noticed too.
+
+    :param db_path: Path to the SQLite database.
+    :param table_name: The name of the table.
+    :return: Dictionary with the database file stats, the table row count/max rowid and the content hash.
+    """
+    file_stats = _file_stats(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        row_count, min_rowid, max_rowid = conn.execute(
+            f"SELECT COUNT(*), MIN(rowid), MAX(rowid) FROM {table_name}").fetchone()
+        digest = hashlib.sha1(repr(conn.execute("SELECT sql FROM sqlite_master WHERE name = ?",
+                                                (table_name,)).fetchone()).encode())
+        if max_rowid is not None:
+            probes = sorted({min_rowid + (max_rowid - min_rowid) * i // (FINGERPRINT_PROBES - 1)
+                             for i in range(FINGERPRINT_PROBES)})
+            for rowid in probes:
+                row = conn.execute(f"SELECT rowid, * FROM {table_name} WHERE rowid >= ? LIMIT 1", (rowid,)).fetchone()
+                digest.update(repr(row).encode())
+    finally:
+        conn.close()
+    return {"files": file_stats, "row_count": row_count, "max_rowid": max_rowid, "content": digest.hexdigest()}
+
+
+def _snapshot_is_current(db_path, table_name, fingerprint_path):
+    """
+    Check a stored fingerprint against the source.
+
+    Unchanged database and -wal files are accepted without touching SQLite. If either changed (any
+    table was written), the table's row count, max rowid and content hash decide, and the stored
+    file stats are refreshed so the next check is cheap again.
+    """
+    if not os.path.exists(fingerprint_path):
+        return False
+    with open(fingerprint_path, 'r') as f:
+        stored = json.load(f)
+
+    if stored.get("files") == _file_stats(db_path):
+        return True
+
+    current = source_fingerprint(db_path, table_name)
+    if any(current[key] != stored.get(key) for key in ("row_count", "max_rowid", "content")):
+        return False
+    with open(fingerprint_path, 'w') as f:
+        json.dump(current, f)
+    return True
+
+
+def read_table_cached(spark, table_name, db_path, jdbc_driver, snapshot_dir, table_schemas=None, columns=None):
+    """
+    Read an SQLite table through a Parquet snapshot, refreshing the snapshot only when the source changed.
+
+    Tables whose data_table_schemas entry has Year and Month columns are partitioned by them (derived
+    from Date when the stored table lacks them), so date-window filters prune whole directories.
+
+    :param spark: The SparkSession.
+    :param table_name: The name of the table to read.
+    :param db_path: Path to the SQLite database.
+    :param jdbc_driver: The JDBC driver class name.
+    :param snapshot_dir: Directory holding one snapshot directory per table.
+    :param table_schemas: The data_table_schemas section of the configuration.
+    :param columns: Optional list of columns to read from the snapshot.
+    :return: Spark DataFrame backed by the Parquet snapshot.
+    """
+    table_dir = os.path.join(snapshot_dir, table_name)
+    data_path = os.path.join(table_dir, "data")
+    fingerprint_path = os.path.join(table_dir, "_fingerprint.json")
+
+    if not _snapshot_is_current(db_path, table_name, fingerprint_path):
+        from pyspark.sql import functions as F
+
+        print(f"Refreshing Parquet snapshot for {table_name}...")
+        os.makedirs(table_dir, exist_ok=True)
+        fingerprint = source_fingerprint(db_path, table_name)
+        df = read_dataframe_from_sqlite(spark, table_name, db_path, jdbc_driver)
+
+        partition_columns = []
+        if {"Year", "Month"} <= set(_schema_columns(table_name, table_schemas or {})):
+            if "Date" in df.columns:
+                if "Year" not in df.columns:
+                    df = df.withColumn("Year", F.year(F.to_date("Date")))
+                if "Month" not in df.columns:
+                    df = df.withColumn("Month", F.month(F.to_date("Date")))
+            if {"Year", "Month"} <= set(df.columns):
+                partition_columns = ["Year", "Month"]
+
+        # Write next to the live snapshot and swap it in, so readers never see a partial copy
+        tmp_path = f"{data_path}.tmp"
+        df.write.mode("overwrite").partitionBy(*partition_columns).parquet(tmp_path)
+        if os.path.exists(data_path):
+            shutil.rmtree(data_path)
+        os.replace(tmp_path, data_path)
+        with open(fingerprint_path, 'w') as f:
+            json.dump(fingerprint, f)
+
+    df = spark.read.parquet(data_path)
+    return df.select(*columns) if columns else df
+
+
+def invalidate_snapshot(table_name, snapshot_dir):
+    """
+    Remove a table's snapshot so the next read rebuilds it from SQLite.
+
+    :param table_name: The name of the table.
+    :param snapshot_dir: Directory holding one snapshot directory per table.
+    """
+    shutil.rmtree(os.path.join(snapshot_dir, table_name), ignore_errors=True)
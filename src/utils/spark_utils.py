@@ -1,16 +1,36 @@
-from pyspark.sql import SparkSession
 import json
 import logging
 import os
-from datetime import datetime
-from src.data.database_operations import get_next_version_number
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from src.data.database_operations import format_stored_dates
+from src.utils.model_registry import ModelRegistry, configure_model_cache
 
 # Set environment variables for Python version consistency
 os.environ["PYSPARK_PYTHON"] = "/opt/anaconda3/bin/python3"
 os.environ["PYSPARK_DRIVER_PYTHON"] = "/opt/anaconda3/bin/python3"
 
+# Smallest number of rows a partitioned JDBC read gives to each partition
+MIN_ROWS_PER_PARTITION = 10000
 
-def load_config(config_path='../../configs/data_config.json'):
+DEFAULT_CONFIG_PATH = os.environ.get("RETAIL_CONFIG_PATH", '../../configs/data_config.json')
+
+# Spark types (pyspark.sql.types class names) for the SQL column types used in data_table_schemas
+SQL_TO_SPARK_TYPES = {
+    "TEXT": "StringType",
+    "REAL": "DoubleType",
+    "FLOAT": "DoubleType",
+    "INTEGER": "LongType",
+    "TIMESTAMP": "TimestampType"
+}
+
+_spark = None
+_spark_lock = threading.Lock()
+
+
+def load_config(config_path=DEFAULT_CONFIG_PATH):
     """
     Load configuration from a JSON file.
 
@@ -22,6 +42,33 @@ def load_config(config_path='../../configs/data_config.json'):
     return config
 
 
+@lru_cache(maxsize=None)
+def get_config(config_path=DEFAULT_CONFIG_PATH):
+    """
+    Load the configuration once per path and return the cached dictionary on later calls.
+
+    :param config_path: Path to the JSON configuration file.
+    :return: Configuration dictionary (shared; do not mutate).
+    """
+    return load_config(config_path)
+
+
+def get_spark():
+    """
+    Return the process-wide SparkSession, starting it on first use from the "spark" config section.
+
+    Importing modules that may use Spark stays cheap: the JVM only starts when a Spark path runs.
+
+    :return: SparkSession object.
+    """
+    global _spark
+    with _spark_lock:
+        if _spark is None:
+            spark_config = get_config()["spark"]
+            _spark = initialize_spark(spark_config["app_name"], spark_config["jdbc_driver_path"])
+        return _spark
+
+
 def initialize_spark(app_name, jdbc_driver_path):
     """
     Initialize a Spark session with the given application name and JDBC driver.
@@ -30,15 +77,115 @@ def initialize_spark(app_name, jdbc_driver_path):
     :param jdbc_driver_path: Path to the JDBC driver jar.
     :return: SparkSession object.
     """
+    from pyspark.sql import SparkSession
+
     spark = SparkSession.builder \
         .appName(app_name) \
         .config("spark.jars", jdbc_driver_path) \
+        .config("spark.sql.execution.arrow.pyspark.enabled", "true") \
+        .config("spark.sql.execution.arrow.pyspark.fallback.enabled", "true") \
+        .config("spark.scheduler.mode", "FAIR") \
         .getOrCreate()
     spark.sparkContext.setLogLevel("ERROR")
     logging.getLogger("py4j").setLevel(logging.ERROR)
     return spark
 
 
+def _pandas_spark_type(dtype):
+    """Infer the Spark type for a pandas dtype."""
+    from pyspark.sql.types import StringType, DoubleType, LongType, BooleanType, TimestampType
+
+    if dtype.kind in "iu":
+        return LongType()
+    if dtype.kind == "f":
+        return DoubleType()
+    if dtype.kind == "b":
+        return BooleanType()
+    if dtype.kind == "M":
+        return TimestampType()
+    return StringType()
+
+
+def _declared_types(table_name, table_schemas):
+    """Map each column declared for a table in data_table_schemas to its upper-cased SQL type."""
+    schema_name = table_name[:-4] if table_name.endswith("_sdf") else table_name
+    declared = {}
+    for name, columns in table_schemas.items():
+        if name.lower() == schema_name.lower():
+            declared = {column.split()[0]: column.split()[1].upper() for column in columns}
+    return declared
+
+
+def spark_schema_from_config(pdf, table_name, table_schemas):
+    """
+    Build an explicit Spark schema for a pandas DataFrame from data_table_schemas.
+
+    Declared column types are used where the pandas data can be represented in them (TEXT, REAL
+    for any numeric column, INTEGER for integer columns). Datetime columns stay timestamps even
+    when declared as TEXT, and columns missing from the config are typed from their pandas dtype.
+
+    :param pdf: The pandas DataFrame.
+    :param table_name: Table name such as "sales_sdf"; matched case-insensitively without "_sdf".
+    :param table_schemas: The data_table_schemas section of the configuration.
+    :return: StructType for the DataFrame's columns, in order.
+    """
+    from pyspark.sql import types
+
+    declared = _declared_types(table_name, table_schemas)
+    fields = []
+    for column, dtype in pdf.dtypes.items():
+        inferred = _pandas_spark_type(dtype)
+        type_name = SQL_TO_SPARK_TYPES.get(declared.get(column))
+        declared_type = getattr(types, type_name)() if type_name else None
+        if declared_type is None or dtype.kind == "M":
+            spark_type = inferred
+        elif isinstance(declared_type, types.StringType) and dtype.kind not in "OSUT":
+            spark_type = inferred
+        elif isinstance(declared_type, types.DoubleType) and dtype.kind not in "iuf":
+            spark_type = inferred
+        elif isinstance(declared_type, types.LongType) and dtype.kind not in "iu":
+            spark_type = inferred
+        else:
+            spark_type = declared_type
+        fields.append(types.StructField(column, spark_type, True))
+    return types.StructType(fields)
+
+
+def pandas_to_spark(spark, pdf, table_name, table_schemas):
+    """
+    Convert a pandas DataFrame to Spark through Arrow with an explicit schema.
+
+    Datetime columns declared as TEXT are formatted as ISO dates first, so the JDBC writer stores
+    them as the same text the native loader does rather than as epoch milliseconds. If the Arrow
+    conversion fails (e.g. a column type Arrow cannot handle), the DataFrame is converted again
+    without Arrow, still with the explicit schema.
+
+    :param spark: The SparkSession.
+    :param pdf: The pandas DataFrame.
+    :param table_name: Table name used to look up the schema in table_schemas.
+    :param table_schemas: The data_table_schemas section of the configuration.
+    :return: Tuple of (Spark DataFrame, conversion time in seconds).
+    """
+    declared = _declared_types(table_name, table_schemas)
+    text_dates = [column for column, dtype in pdf.dtypes.items()
+                  if dtype.kind == "M" and declared.get(column) == "TEXT"]
+    if text_dates:
+        pdf = pdf.assign(**{column: format_stored_dates(pdf[column]) for column in text_dates})
+    schema = spark_schema_from_config(pdf, table_name, table_schemas)
+    start_time = time.perf_counter()
+    try:
+        spark.conf.set("spark.sql.execution.arrow.pyspark.enabled", "true")
+        sdf = spark.createDataFrame(pdf, schema=schema)
+    except Exception as e:
+        logging.warning(f"Arrow conversion failed for {table_name}, falling back to row conversion: {e}")
+        spark.conf.set("spark.sql.execution.arrow.pyspark.enabled", "false")
+        try:
+            sdf = spark.createDataFrame(pdf, schema=schema)
+        finally:
+            spark.conf.set("spark.sql.execution.arrow.pyspark.enabled", "true")
+    return sdf, time.perf_counter() - start_time
+
+
 def insert_dataframe_to_sqlite(df, table_name, db_path, jdbc_driver):
     """
     Insert a Spark DataFrame into an SQLite database using JDBC.
@@ -59,20 +206,136 @@ def insert_dataframe_to_sqlite(df, table_name, db_path, jdbc_driver):
     print(f"Finished inserting data into {table_name} table.")
 
 
-def read_dataframe_from_sqlite(spark, table_name, db_path, jdbc_driver):
-    df = spark.read.format("jdbc") \
-        .option("url", f"jdbc:sqlite:{db_path}") \
+def _partition_ranges(db_path, table_name, partition_column, num_partitions, where=None):
+    """
+    Discover partition bounds for a column directly from SQLite.
+
+    Integer columns (such as rowid) get (lower, upper) bounds for Spark's numeric partitioning.
+    Other sortable columns (such as a TEXT Date) are split with NTILE into value ranges of about
+    equal row counts and returned as a list of boundary values.
+    """
+    where_clause = f" WHERE {where}" if where else ""
+    conn = sqlite3.connect(db_path)
+    try:
+        lower, upper = conn.execute(
+            f"SELECT MIN({partition_column}), MAX({partition_column}) FROM {table_name}{where_clause}").fetchone()
+        if lower is None or (isinstance(lower, int) and isinstance(upper, int)):
+            return lower, upper
+        rows = conn.execute(
+            f"SELECT MIN(value) FROM (SELECT {partition_column} AS value, "
+            f"NTILE({num_partitions}) OVER (ORDER BY {partition_column}) AS tile "
+            f"FROM {table_name}{where_clause}) WHERE value IS NOT NULL GROUP BY tile ORDER BY 1").fetchall()
+        return sorted({row[0] for row in rows})
+    finally:
+        conn.close()
+
+
+def _sql_literal(value):
+    """Render a bound value as an SQL literal."""
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+
+def read_dataframe_from_sqlite(spark, table_name, db_path, jdbc_driver, partition_column="rowid", num_partitions=None,
+                               fetch_size=10000, columns=None, where=None):
+    """
+    Read an SQLite table into a Spark DataFrame over JDBC using parallel, partitioned reads.
+
+    Bounds for the partition column are discovered from the database. Integer columns (rowid by
+    default) use Spark's lowerBound/upperBound partitioning; other columns such as Date are split
+    into value ranges with about equal row counts, one JDBC predicate per partition. Column and
+    row filters are pushed down into the SQL sent to SQLite.
+
+    :param spark: The SparkSession.
+    :param table_name: The name of the table to read.
+    :param db_path: Path to the SQLite database.
+    :param jdbc_driver: The JDBC driver class name.
+    :param partition_column: Column to partition the read on ("rowid", an integer column or e.g. "Date");
+                             None reads the table as a single partition.
+    :param num_partitions: Number of partitions (defaults to the Spark default parallelism). Integer
+                           ranges are capped so each partition covers at least MIN_ROWS_PER_PARTITION rows.
+    :param fetch_size: Number of rows fetched per JDBC round trip.
+    :param columns: Optional list of columns to read; all columns when None.
+    :param where: Optional SQL predicate (e.g. "Date >= '2023-01-01'") applied inside SQLite.
+    :return: Spark DataFrame.
+    """
+    url = f"jdbc:sqlite:{db_path}"
+    select_list = ", ".join(columns) if columns else "*"
+    where_clause = f" WHERE {where}" if where else ""
+    num_partitions = num_partitions or spark.sparkContext.defaultParallelism
+
+    reader = spark.read.format("jdbc") \
+        .option("url", url) \
         .option("driver", jdbc_driver) \
-        .option("dbtable", table_name) \
-        .load()
-    return df
-
-
-def save_spark_model(model, model_name, db_path):
-    version = get_next_version_number(model_name, db_path)
-    date_path = datetime.now().strftime("%Y%m%d")
-    base_path = f"./results/models/{date_path}"
-    os.makedirs(base_path, exist_ok=True)
-    file_path = f"{base_path}/{model_name}_v{version}"
-    model.save(file_path)
-    return file_path, version
+        .option("fetchsize", fetch_size)
+
+    if partition_column is None or num_partitions <= 1:
+        query = f"(SELECT {select_list} FROM {table_name}{where_clause}) AS src" if columns or where else table_name
+        return reader.option("dbtable", query).load()
+
+    bounds = _partition_ranges(db_path, table_name, partition_column, num_partitions, where)
+    if isinstance(bounds, tuple):
+        lower, upper = bounds
+        if lower is None:
+            return reader.option("dbtable", f"(SELECT {select_list} FROM {table_name}{where_clause}) AS src").load()
+        num_partitions = max(1, min(num_partitions, (upper - lower + 1) // MIN_ROWS_PER_PARTITION))
+        # Expose the partition column under an alias so rowid (or a column not in `columns`) can be used
+        query = f"(SELECT {select_list}, {partition_column} AS _partition_key FROM {table_name}{where_clause}) AS src"
+        return reader.option("dbtable", query) \
+            .option("partitionColumn", "_partition_key") \
+            .option("lowerBound", lower) \
+            .option("upperBound", upper + 1) \
+            .option("numPartitions", num_partitions) \
+            .load() \
+            .drop("_partition_key")
+
+    # Non-numeric column: one predicate per value range, NULLs go to the first partition
+    extra_columns = [partition_column] if columns and partition_column not in columns else []
+    if columns or where:
+        query = f"(SELECT {', '.join(list(columns or ['*']) + extra_columns)} FROM {table_name}{where_clause}) AS src"
+    else:
+        query = table_name
+    literals = [_sql_literal(value) for value in bounds]
+    predicates = []
+    for i, lower in enumerate(literals):
+        predicate = f"{partition_column} >= {lower}"
+        if i + 1 < len(literals):
+            predicate += f" AND {partition_column} < {literals[i + 1]}"
+        if i == 0:
+            predicate = f"({predicate}) OR {partition_column} IS NULL"
+        predicates.append(predicate)
+    if not predicates:
+        return reader.option("dbtable", query).load().drop(*extra_columns)
+    properties = {"driver": jdbc_driver, "fetchsize": str(fetch_size)}
+    return spark.read.jdbc(url, query, predicates=predicates, properties=properties).drop(*extra_columns)
+
+
+def get_model_registry(db_path):
+    """
+    Return a ModelRegistry on the configured model_info table, sizing the shared model cache from
+    the "model_registry" config section.
+
+    :param db_path: Path to the SQLite database.
+    :return: ModelRegistry object.
+    """
+    config = get_config()
+    registry_config = config.get("model_registry", {})
+    max_mb = registry_config.get("cache_max_mb")
+    configure_model_cache(registry_config.get("cache_size", 8), max_mb * 1024 * 1024 if max_mb else None)
+    return ModelRegistry(db_path, root=registry_config.get("root", "./results/models"),
+                         columns=config.get("model_table_schemas", {}).get("model_info"))
+
+
+def save_spark_model(model, model_name, db_path, metrics=None, **columns):
+    """
+    Save a Spark model under the next version allocated by the model registry.
+
+    :param model: Fitted Spark model.
+    :param model_name: The name of the model.
+    :param db_path: Path to the SQLite database holding model_info.
+    :param metrics: Optional dictionary of metrics recorded with the model.
+    :param columns: Values for other model_info columns (e.g. Silhouette_Score=0.7).
+    :return: Tuple of (file path, version).
+    """
+    return get_model_registry(db_path).save(model, model_name, metrics=metrics, **columns)
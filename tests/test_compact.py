@@ -0,0 +1,23 @@
+import os
+
+import numpy as np
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("RETAIL_CONFIG_PATH", os.path.join(REPO_ROOT, "configs", "data_config.json"))
+
+from src.data.compact import ID_FORMATS, decode_ids, encode_ids  # noqa: E402
+
+
+@pytest.mark.parametrize("id_column", sorted(ID_FORMATS))
+def test_encode_decode_round_trip(id_column):
+    prefix, width = ID_FORMATS[id_column]
+    ids = [f"{prefix}{str(number).zfill(width)}" for number in (0, 7, 42, 10095000, 2 ** 31 - 1)]
+    keys = encode_ids(ids, id_column)
+    assert keys.dtype == np.int32
+    assert decode_ids(keys, id_column).tolist() == ids
+
+
+def test_encode_ids_rejects_numbers_beyond_int32():
+    with pytest.raises(ValueError, match="C2220900005"):
+        encode_ids(["C0001", "C2220900005"], "Customer_ID")
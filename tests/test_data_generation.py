@@ -0,0 +1,39 @@
+import os
+
+import pandas as pd
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("RETAIL_CONFIG_PATH", os.path.join(REPO_ROOT, "configs", "data_config.json"))
+
+from src.data import data_generation as dg  # noqa: E402
+from src.data.compact import decode_ids  # noqa: E402
+
+
+def _generate(workers):
+    dg.configure(num_products=20, num_customers=200, num_years=1, workers=workers)
+    try:
+        return dg.generate_dataframes()
+    finally:
+        dg.configure()
+
+
+def test_generate_dataframes_independent_of_worker_count():
+    single, pooled = _generate(1), _generate(2)
+    assert single.keys() == pooled.keys()
+    for table_name in single:
+        pd.testing.assert_frame_equal(single[table_name], pooled[table_name], obj=table_name)
+
+
+
+def test_sales_reference_the_store_dimension_in_both_layouts():
+    tables = {}
+    for compact in (False, True):
+        dg.configure(num_products=20, num_customers=200, num_years=1, num_stores=10, compact=compact)
+        try:
+            tables[compact] = dg.generate_dataframes()
+        finally:
+            dg.configure()
+    wide, compact = tables[False], tables[True]
+    assert set(wide["sales_sdf"]["Store_ID"]) <= set(wide["store_sdf"]["Store_ID"])
+    assert set(compact["sales_sdf"]["Store_Key"]) <= set(compact["store_sdf"]["Store_Key"])
+    assert decode_ids(compact["sales_sdf"]["Store_Key"], "Store_ID").tolist() == wide["sales_sdf"]["Store_ID"].tolist()
@@ -0,0 +1,91 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("RETAIL_CONFIG_PATH", os.path.join(REPO_ROOT, "configs", "data_config.json"))
+
+from src.data.database_operations import close_all_connections  # noqa: E402
+from src.models.customer_segmentation.feature_store import (load_customer_features,  # noqa: E402
+                                                            update_customer_features)
+
+SALES = [("T0000001", "P00001", "S000", "C0001", "2023-01-02", 1, 10.0),
+         ("T0000002", "P00002", "S001", "C0002", "2023-01-03", 2, 20.0),
+         ("T0000003", "P00001", "S000", "C0001", "2023-01-05", 1, 10.0)]
+NEW_SALES = [("T0000004", "P00002", "S001", "C0001", "2023-02-01", 3, 30.0),
+             ("T0000005", "P00001", "S000", "C0003", "2023-02-02", 1, 10.0)]
+
+
+def _create_database(db_path, sales):
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE product_sdf (Product_ID TEXT, Category TEXT)")
+    conn.executemany("INSERT INTO product_sdf VALUES (?, ?)", [("P00001", "Groceries"), ("P00002", "Toys")])
+    conn.execute("CREATE TABLE sales_sdf (Transaction_ID TEXT, Product_ID TEXT, Store_ID TEXT, Customer_ID TEXT, "
+                 "Date TEXT, Quantity_Sold INTEGER, Sales_Amount REAL)")
+    conn.executemany("INSERT INTO sales_sdf VALUES (?, ?, ?, ?, ?, ?, ?)", sales)
+    conn.execute("CREATE TABLE loyalty_sdf (Loyalty_ID TEXT, Customer_ID TEXT, Points_Earned REAL, "
+                 "Points_Redeemed REAL, Membership_Tier TEXT)")
+    conn.executemany("INSERT INTO loyalty_sdf VALUES (?, ?, ?, ?, ?)",
+                     [("LOY0000001", "C0001", 20.0, 5.0, "Silver"), ("LOY0000002", "C0002", 20.0, 0.0, "Bronze")])
+    conn.commit()
+    return conn
+
+
+def _features(db_path):
+    return load_customer_features(db_path).drop(columns="Updated_At").sort_values("Customer_ID",
+                                                                                   ignore_index=True)
+
+
+@pytest.fixture(autouse=True)
+def _close_connections():
+    yield
+    close_all_connections()
+
+
+def test_appended_sales_are_folded_in_incrementally(tmp_path):
+    db_path = str(tmp_path / "retail.db")
+    conn = _create_database(db_path, SALES)
+    assert update_customer_features(db_path)["new_sales_rows"] == 3
+
+    conn.executemany("INSERT INTO sales_sdf VALUES (?, ?, ?, ?, ?, ?, ?)", NEW_SALES)
+    conn.execute("INSERT INTO loyalty_sdf VALUES ('LOY0000003', 'C0003', 10.0, 2.0, 'Bronze')")
+    conn.commit()
+    conn.close()
+    result = update_customer_features(db_path)
+    assert result == {"new_sales_rows": 2, "customers_updated": 2, "rebuilt": False}
+    assert update_customer_features(db_path)["new_sales_rows"] == 0
+
+    fresh_path = str(tmp_path / "fresh.db")
+    _create_database(fresh_path, SALES + NEW_SALES).close()
+    conn = sqlite3.connect(fresh_path)
+    conn.execute("INSERT INTO loyalty_sdf VALUES ('LOY0000003', 'C0003', 10.0, 2.0, 'Bronze')")
+    conn.commit()
+    conn.close()
+    update_customer_features(fresh_path)
+    pd.testing.assert_frame_equal(_features(db_path), _features(fresh_path))
+
+    customer = _features(db_path).set_index("Customer_ID").loc["C0001"]
+    assert (customer["Frequency"], customer["Monetary"], customer["Category_Variety"]) == (3, 50.0, 2)
+    assert (customer["Points_Redeemed"], customer["Membership_Tier"]) == (5.0, "Silver")
+
+
+def test_rebuilt_sales_table_rebuilds_features(tmp_path):
+    db_path = str(tmp_path / "retail.db")
+    conn = _create_database(db_path, SALES)
+    update_customer_features(db_path)
+
+    # Same number of rows, different content: the watermark row no longer matches its fingerprint
+    conn.execute("DROP TABLE sales_sdf")
+    conn.execute("CREATE TABLE sales_sdf (Transaction_ID TEXT, Product_ID TEXT, Store_ID TEXT, Customer_ID TEXT, "
+                 "Date TEXT, Quantity_Sold INTEGER, Sales_Amount REAL)")
+    conn.executemany("INSERT INTO sales_sdf VALUES (?, ?, ?, ?, ?, ?, ?)", NEW_SALES + SALES[:1])
+    conn.commit()
+    conn.close()
+
+    result = update_customer_features(db_path)
+    assert result["rebuilt"] and result["new_sales_rows"] == 3
+    features = _features(db_path)
+    assert features["Customer_ID"].tolist() == ["C0001", "C0003"]
+    assert features["Frequency"].tolist() == [2, 1]
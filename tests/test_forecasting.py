@@ -0,0 +1,35 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("RETAIL_CONFIG_PATH", os.path.join(REPO_ROOT, "configs", "data_config.json"))
+
+from src.models.sales_forecasting.forecasting import forecast_panel  # noqa: E402
+
+
+def _panel(num_days, num_series=3):
+    rng = np.random.default_rng(0)
+    weekly = np.tile([5.0, 4.0, 4.0, 5.0, 6.0, 9.0, 8.0], num_days // 7 + 1)[:num_days]
+    return {
+        "values": weekly + rng.normal(0, 0.5, (num_series, num_days)),
+        "dates": pd.date_range("2023-01-01", periods=num_days),
+        "keys": pd.DataFrame({"Product_ID": [f"P{i:05d}" for i in range(num_series)],
+                              "Store_ID": [f"S{i:03d}" for i in range(num_series)]})
+    }
+
+
+def test_forecast_panel_with_valid_holdout():
+    forecast_df, report = forecast_panel(_panel(70), horizon=14, holdout_days=28)
+    assert len(forecast_df) == 3 * 14
+    assert (forecast_df["Forecast_Quantity"] >= 0).all()
+    assert sum(report["models_chosen"].values()) == 3
+
+
+@pytest.mark.parametrize("holdout_days", [0, -7, 57])
+def test_forecast_panel_rejects_invalid_holdout(holdout_days):
+    # 70 days leave room for at most 70 - 2 * 7 = 56 holdout days
+    with pytest.raises(ValueError, match="holdout_days"):
+        forecast_panel(_panel(70), horizon=14, holdout_days=holdout_days)
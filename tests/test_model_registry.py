@@ -0,0 +1,23 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("RETAIL_CONFIG_PATH", os.path.join(REPO_ROOT, "configs", "data_config.json"))
+
+from src.utils.model_registry import ModelRegistry  # noqa: E402
+
+
+def _allocate(db_path, root, count):
+    registry = ModelRegistry(db_path, root=root)
+    return [registry.allocate_version("segmentation", "numpy", ".npz")[0] for _ in range(count)]
+
+
+def test_concurrent_processes_get_distinct_versions(tmp_path):
+    db_path, root = str(tmp_path / "registry.db"), str(tmp_path / "models")
+    ModelRegistry(db_path, root=root)
+    with ProcessPoolExecutor(max_workers=4, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(_allocate, db_path, root, 5) for _ in range(4)]
+        versions = [version for future in futures for version in future.result()]
+    assert sorted(versions) == list(range(1, 21))
+    assert [row[0] for row in ModelRegistry(db_path, root=root).list_versions("segmentation")] == list(range(1, 21))
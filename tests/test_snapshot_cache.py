@@ -0,0 +1,60 @@
+import json
+import os
+import sqlite3
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("RETAIL_CONFIG_PATH", os.path.join(REPO_ROOT, "configs", "data_config.json"))
+
+from src.utils.snapshot_cache import _snapshot_is_current, source_fingerprint  # noqa: E402
+
+
+def _load(conn, table_name, values):
+    conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+    conn.execute(f"CREATE TABLE {table_name} (Transaction_ID TEXT, Sales_Amount REAL)")
+    conn.executemany(f"INSERT INTO {table_name} VALUES (?, ?)",
+                     [(f"T{i:07d}", value) for i, value in enumerate(values)])
+    conn.commit()
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    """A database with sales_sdf and the fingerprint of a snapshot taken of it."""
+    db_path = str(tmp_path / "retail.db")
+    fingerprint_path = str(tmp_path / "_fingerprint.json")
+    conn = sqlite3.connect(db_path)
+    _load(conn, "sales_sdf", [float(i) for i in range(100)])
+    _load(conn, "product_sdf", [1.0])
+    with open(fingerprint_path, "w") as f:
+        json.dump(source_fingerprint(db_path, "sales_sdf"), f)
+    yield conn, db_path, fingerprint_path
+    conn.close()
+
+
+def test_unchanged_source_is_current(snapshot):
+    _, db_path, fingerprint_path = snapshot
+    assert _snapshot_is_current(db_path, "sales_sdf", fingerprint_path)
+
+
+def test_reload_with_same_row_count_invalidates(snapshot):
+    conn, db_path, fingerprint_path = snapshot
+    _load(conn, "sales_sdf", [float(i) + 0.5 for i in range(100)])
+    assert not _snapshot_is_current(db_path, "sales_sdf", fingerprint_path)
+
+
+def test_write_to_another_table_keeps_snapshot(snapshot):
+    conn, db_path, fingerprint_path = snapshot
+    _load(conn, "product_sdf", [2.0, 3.0])
+    assert _snapshot_is_current(db_path, "sales_sdf", fingerprint_path)
+
+
+def test_write_held_in_wal_invalidates(snapshot):
+    conn, db_path, fingerprint_path = snapshot
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA wal_autocheckpoint = 0")
+    with open(fingerprint_path, "w") as f:
+        json.dump(source_fingerprint(db_path, "sales_sdf"), f)
+    conn.execute("UPDATE sales_sdf SET Sales_Amount = -1 WHERE rowid = 1")
+    conn.commit()
+    assert not _snapshot_is_current(db_path, "sales_sdf", fingerprint_path)